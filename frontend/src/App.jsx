@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import Header from './components/Header';
 import ScraperForm from './components/ScraperForm';
 import AIAgentPanel from './components/AIAgentPanel';
@@ -19,6 +19,8 @@ export default function App() {
   const [results, setResults] = useState([]);
   const [businessLines, setBusinessLines] = useState([]);
   const [startTime, setStartTime] = useState(null);
+  // Results file and count last loaded from /api/results
+  const loadedResults = useRef(null);
   const [cacheStats, setCacheStats] = useState({ entries: 0, size_kb: 0 });
   const [validationConfig, setValidationConfig] = useState({
     retry_delay: 5,
@@ -38,8 +40,20 @@ export default function App() {
         .then(res => res.json())
         .then(data => {
           setStatus(data);
-          if (data.scraping.results && data.scraping.results.length > 0) {
-            setResults(data.scraping.results);
+          // The status only carries the latest leads of a running scrape; once
+          // nothing is running, load the full results (from the results file) once
+          const running = data.scraping.is_running || data.validation.is_running || data.agent.is_running;
+          const resultsKey = `${data.scraping.results_file}:${data.scraping.results_count}`;
+          if (data.scraping.is_running) {
+            if (data.scraping.results && data.scraping.results.length > 0) {
+              setResults(data.scraping.results);
+            }
+          } else if (!running && data.scraping.results_file && resultsKey !== loadedResults.current) {
+            loadedResults.current = resultsKey;
+            fetch('http://localhost:5001/api/results')
+              .then(res => res.json())
+              .then(leads => setResults(leads))
+              .catch(err => console.error('Error fetching results:', err));
           }
           if (data.scraping.is_running && !startTime) {
             setStartTime(Date.now());
@@ -185,7 +199,7 @@ export default function App() {
 
         {/* Database Panel */}
         <div className="mb-8">
-          <DatabasePanel results={results} params={params} />
+          <DatabasePanel results={results} params={params} sessionId={status?.scraping?.session_id} />
         </div>
 
         {/* Results Section */}
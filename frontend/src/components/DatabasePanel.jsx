@@ -1,7 +1,7 @@
 import { Database, Save, Trash2, Calendar, TrendingUp } from 'lucide-react';
 import { useState, useEffect } from 'react';
 
-export default function DatabasePanel({ results, params }) {
+export default function DatabasePanel({ results, params, sessionId }) {
   const [sessions, setSessions] = useState([]);
   const [selectedSession, setSelectedSession] = useState(null);
   const [saving, setSaving] = useState(false);
@@ -37,7 +37,9 @@ export default function DatabasePanel({ results, params }) {
           companies: results,
           business_line: params.main_business_line,
           location: params.location,
-          company_form: params.company_form
+          company_form: params.company_form,
+          // Save into the scrape job's session instead of creating another one
+          session_id: sessionId ?? undefined
         })
       });
 
@@ -58,7 +60,7 @@ export default function DatabasePanel({ results, params }) {
 
   const loadSession = async (sessionId) => {
     try {
-      const response = await fetch(`http://localhost:5001/api/db/companies/session/${sessionId}`);
+      const response = await fetch(`http://localhost:5001/api/db/companies/session/${sessionId}?fields=summary`);
       const data = await response.json();
       
       if (data.success) {
@@ -1,6 +1,5 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
-import json
 import os
 from threading import Thread
 
@@ -9,14 +8,15 @@ from services.finder_service import run_finder_validation
 from services.scraper_service import run_scraper
 from services.enrichment_service import run_agent_enrichment
 from services.cache_service import load_finder_cache
-from utils.export_utils import export_to_csv
+from services.db_service import DatabaseService
+from utils.export_utils import iter_csv, iter_leads, iter_json_array, ndjson_path
 
 # Import database routes
 from routes.db_routes import db_bp
 
 # Import models
 from models.status_models import scraping_status, validation_status, agent_status
-from models.db_models import init_db
+from models.db_models import init_db, remove_session
 
 # Import config
 from config import BUSINESS_LINES
@@ -36,6 +36,11 @@ except Exception as e:
 # Register database blueprint
 app.register_blueprint(db_bp)
 
+# Return the request's database connection to the pool
+@app.teardown_appcontext
+def close_db_session(exception=None):
+    remove_session()
+
 # Add debug logging
 @app.after_request
 def after_request(response):
@@ -61,6 +66,41 @@ def start_scrape():
     return jsonify({'message': 'Scraping started', 'status': 'running'})
 
 
+@app.route('/api/scrape/resume/<int:session_id>', methods=['POST'])
+def resume_scrape(session_id):
+    """Resume an interrupted scrape job from its saved cursor"""
+    if scraping_status['is_running']:
+        return jsonify({'error': 'Scraping already in progress'}), 400
+    
+    try:
+        state = DatabaseService.get_scrape_state(session_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    if not state:
+        return jsonify({'error': 'Session not found'}), 404
+    if not state['params']:
+        return jsonify({'error': 'Session was not created by a scrape job and cannot be resumed'}), 400
+    if state['status'] == 'completed':
+        return jsonify({'error': 'Session is already completed'}), 400
+    
+    # Start scraping in background thread
+    thread = Thread(target=run_scraper, args=(None, scraping_status), kwargs={'resume_session_id': session_id})
+    thread.daemon = True
+    thread.start()
+    
+    return jsonify({
+        'message': 'Scraping resumed',
+        'status': 'running',
+        'session_id': session_id,
+        'cursor': {
+            'page': state['cursor'].get('page', 1),
+            'offset': state['cursor'].get('offset', 0),
+            'processed': state['cursor'].get('processed', len(state['cursor'].get('processed_ids', [])))
+        }
+    })
+
+
 @app.route('/api/validate', methods=['POST'])
 def validate_with_finder():
     """Validate leads with finder.fi"""
@@ -95,7 +135,14 @@ def get_status():
 
 @app.route('/api/results', methods=['GET'])
 def get_results():
-    """Get current results"""
+    """Get current results
+    
+    The status only holds the latest few leads; the full results of the last
+    scrape, validation or enrichment run are streamed from its NDJSON file.
+    """
+    results_file = scraping_status.get('results_file')
+    if results_file and os.path.exists(results_file):
+        return Response(stream_with_context(iter_json_array(results_file)), mimetype='application/json')
     return jsonify(scraping_status['results'])
 
 
@@ -122,10 +169,23 @@ def enrich_with_agent():
 
 @app.route('/api/download', methods=['GET'])
 def download_results():
-    """Download results as JSON file"""
+    """Download results as JSON file
+    
+    Results are kept as NDJSON; they are streamed out as a JSON array (or as
+    raw NDJSON with format=ndjson) without loading the whole file.
+    """
     filename = request.args.get('filename', 'companies_leads.json')
+    results_file = ndjson_path(filename)
     
-    if os.path.exists(filename):
+    if os.path.exists(results_file):
+        if request.args.get('format') == 'ndjson':
+            return send_file(results_file, as_attachment=True, mimetype='application/x-ndjson')
+        return Response(
+            stream_with_context(iter_json_array(results_file)),
+            mimetype='application/json',
+            headers={'Content-Disposition': f'attachment; filename={os.path.basename(filename)}'}
+        )
+    elif os.path.exists(filename):
         return send_file(filename, as_attachment=True)
     else:
         return jsonify({'error': 'File not found'}), 404
@@ -133,18 +193,23 @@ def download_results():
 
 @app.route('/api/download-csv', methods=['GET'])
 def download_csv():
-    """Download results as CSV file"""
-    filename = request.args.get('filename', 'companies_leads.csv')
+    """Download results as CSV file
     
-    # If CSV doesn't exist but JSON does, create it
+    An existing CSV file is sent as is. Otherwise the CSV is generated from the
+    results (NDJSON, or a legacy JSON file) and sent as a chunked response
+    while it is being generated.
+    """
+    filename = request.args.get('filename', 'companies_leads.csv')
     json_filename = filename.replace('.csv', '.json')
-    if not os.path.exists(filename) and os.path.exists(json_filename):
-        with open(json_filename, 'r', encoding='utf-8') as f:
-            leads = json.load(f)
-        export_to_csv(leads, filename)
     
     if os.path.exists(filename):
         return send_file(filename, as_attachment=True, mimetype='text/csv')
+    elif os.path.exists(ndjson_path(json_filename)) or os.path.exists(json_filename):
+        return Response(
+            stream_with_context(iter_csv(iter_leads(json_filename))),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={os.path.basename(filename)}'}
+        )
     else:
         return jsonify({'error': 'File not found'}), 404
 
@@ -153,9 +218,7 @@ def download_csv():
 def clear_cache():
     """Clear Finder.fi cache"""
     try:
-        cache_file = 'finder_cache.json'
-        if os.path.exists(cache_file):
-            os.remove(cache_file)
+        load_finder_cache().clear()
         return jsonify({'message': 'Cache cleared successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -164,11 +227,7 @@ def clear_cache():
 @app.route('/api/cache/stats', methods=['GET'])
 def cache_stats():
     """Get cache statistics"""
-    cache = load_finder_cache()
-    return jsonify({
-        'entries': len(cache),
-        'size_kb': os.path.getsize('finder_cache.json') / 1024 if os.path.exists('finder_cache.json') else 0
-    })
+    return jsonify(load_finder_cache().stats())
 
 
 @app.route('/api/business-lines', methods=['GET'])
@@ -0,0 +1,179 @@
+import asyncio
+import aiohttp
+from ytj_scraper import FetchedPage, YTJCompanyScraper
+from utils.rate_limiter import rate_limiter
+from utils.html_parser import parse_html
+from utils.http_fetch import BodyReader, NotHTML, is_html
+from utils.matchers import unwrap_redirect
+from config import FETCH_CHUNK_BYTES
+
+
+class AsyncYTJCompanyScraper(YTJCompanyScraper):
+    """asyncio/aiohttp version of YTJCompanyScraper
+
+    Network methods (get_companies, try_fetch_url, duckduckgo_search,
+    extract_contact_info) are coroutines sharing one aiohttp session, so a single
+    event loop can keep hundreds of fetches in flight. The connector caps the
+    total number of open connections and the number per host. Parsing helpers
+    (process_company, is_valid_website, parse_contact_pages, ...) are inherited.
+
+    Use as an async context manager:
+
+        async with AsyncYTJCompanyScraper() as scraper:
+            data = await scraper.get_companies('62')
+    """
+
+    def __init__(self, max_connections=200, per_host_limit=4, timeout=10):
+        super().__init__()
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.async_session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """Create the aiohttp session (must be called from a running event loop)"""
+        if self.async_session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.per_host_limit
+            )
+            self.async_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers=dict(self.session.headers)
+            )
+
+    async def close(self):
+        if self.async_session is not None:
+            await self.async_session.close()
+            self.async_session = None
+        self.session.close()
+
+    async def get_companies(self, main_business_line=None, location=None, company_form=None, page=1):
+        """Fetch companies from YTJ API"""
+        url = f"{self.base_url}/companies"
+        params = {}
+
+        if main_business_line:
+            params['mainBusinessLine'] = main_business_line
+        if location:
+            params['location'] = location
+        if company_form:
+            params['companyForm'] = company_form
+        if page > 1:
+            params['page'] = page
+
+        try:
+            print(f"  API Request: {url}")
+            print(f"  Parameters: {params}")
+            await rate_limiter.acquire_async(url)
+            async with self.async_session.get(url, params=params) as response:
+                response.raise_for_status()
+                data = await response.json()
+            print(f"  Total results from API: {data.get('totalResults', 0)}")
+            return data
+        except Exception as e:
+            print(f"Error fetching companies: {e}")
+            return None
+
+    async def _fetch_text(self, url):
+        """Bounded, streamed read of an HTML page (see YTJCompanyScraper.fetch_page)"""
+        await rate_limiter.acquire_async(url)
+        async with self.async_session.get(url) as response:
+            response.raise_for_status()
+            if not is_html(response.headers.get('Content-Type')):
+                raise NotHTML(response.headers.get('Content-Type'))
+
+            reader = BodyReader(response.charset)
+            async for chunk in response.content.iter_chunked(FETCH_CHUNK_BYTES):
+                if not reader.feed(chunk):
+                    print(f"  ⚠ {url} is larger than {reader.max_bytes} bytes, using the first part")
+                    break
+            return FetchedPage(str(response.url), reader.text())
+
+    async def try_fetch_url(self, url):
+        """Try to fetch URL, with fallback to www/non-www version
+
+        Returns a FetchedPage (url, text), or None.
+        """
+        if not url:
+            return None
+
+        url = self.normalize_url(url)
+
+        try:
+            return await self._fetch_text(url)
+        except NotHTML:
+            return None
+        except Exception:
+            # Try alternate version (add/remove www)
+            try:
+                if '://www.' in url:
+                    alternate_url = url.replace('://www.', '://')
+                else:
+                    alternate_url = url.replace('://', '://www.')
+
+                return await self._fetch_text(alternate_url)
+            except Exception:
+                return None
+
+    async def duckduckgo_search(self, company_name):
+        """Search for company website using DuckDuckGo, filtering out directories"""
+        try:
+            search_url = "https://html.duckduckgo.com/html/"
+            data = {'q': company_name}
+
+            await rate_limiter.acquire_async(search_url)
+            async with self.async_session.post(search_url, data=data) as response:
+                html = await response.text(errors='replace')
+            soup = parse_html(html)
+
+            results = soup.find_all('a', class_='result__a')
+            for result in results[:5]:
+                url = result.get('href')
+                if self.is_valid_website(url):
+                    return unwrap_redirect(url)
+
+            return None
+        except Exception as e:
+            print(f"  Error searching for {company_name}: {e}")
+            return None
+
+    async def extract_contact_info(self, url, company_name=None):
+        """Scrape contact information from website
+
+        Contact pages are fetched concurrently; HTML parsing runs in the default
+        executor so it does not stall other in-flight fetches on the loop.
+        """
+        if not url:
+            return {}
+
+        url = self.normalize_url(url)
+        loop = asyncio.get_running_loop()
+        pages = []
+
+        try:
+            page = await self.try_fetch_url(url)
+            if not page:
+                return self._empty_contact_info()
+
+            soup = await loop.run_in_executor(None, parse_html, page.text)
+            contact_links = self.find_contact_links(soup, page.url)[:2]
+
+            pages.append(page.text)
+            contact_pages = await asyncio.gather(
+                *(self.try_fetch_url(page_url) for page_url in contact_links),
+                return_exceptions=True
+            )
+            pages.extend(page.text for page in contact_pages if isinstance(page, FetchedPage))
+        except Exception as e:
+            print(f"  Error scraping {url}: {e}")
+
+        return await loop.run_in_executor(None, self.parse_contact_pages, url, pages)
@@ -0,0 +1,94 @@
+"""
+Compare HTML parser backends on saved pages
+
+Usage (from the python/ directory):
+    python -m benchmarks.html_parsers [page1.html pages_dir/ ...] [--repeat 5]
+
+Without paths the pages in benchmarks/fixtures/ are used: company websites
+(ytj/) and Finder.fi company pages (finder/). For every backend prints the
+mean parse time per page and checks that the contact extraction (emails,
+phones, contacts, social media, contact links) and the Finder.fi company
+data are identical to the 'html.parser' result.
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+from services.finder_service import _extract_company_data
+from utils import html_parser
+from utils.html_parser import PARSERS, parse_html
+from ytj_scraper import YTJCompanyScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixtures(paths):
+    fixtures = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                fixtures.extend(os.path.join(root, name) for name in sorted(names)
+                                if name.endswith(('.html', '.htm')))
+        else:
+            fixtures.append(path)
+    return [(path, open(path, encoding='utf-8', errors='replace').read()) for path in fixtures]
+
+
+def extract(scraper, html):
+    """Fields the scraper extracts from one page with the currently selected backend"""
+    url = 'https://www.example.fi'
+    finder_data = {'basic_info': {}, 'financials': {}, 'contact': {}, 'key_people': []}
+    with contextlib.redirect_stdout(io.StringIO()):
+        _extract_company_data(parse_html(html), finder_data)
+    return (
+        scraper.parse_contact_pages(url, [html]),
+        scraper.find_contact_links(parse_html(html), url),
+        finder_data
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('paths', nargs='*', default=[FIXTURES_DIR],
+                            help='Saved .html files or directories of them (default: benchmarks/fixtures)')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='Parses per page and backend')
+    args = arg_parser.parse_args()
+
+    fixtures = load_fixtures(args.paths)
+    if not fixtures:
+        arg_parser.error('no .html fixtures found')
+
+    scraper = YTJCompanyScraper()
+    baseline = {}
+    print(f"{len(fixtures)} pages, {sum(len(html) for _, html in fixtures) // 1024} KiB")
+
+    for backend in sorted(PARSERS, key=lambda name: name != 'html.parser'):
+        if html_parser.resolve_parser(backend) != backend:
+            continue
+        html_parser.parser = backend
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, html in fixtures:
+                parse_html(html)
+        per_page = (time.perf_counter() - start) / (args.repeat * len(fixtures))
+
+        mismatches = []
+        for path, html in fixtures:
+            fields = extract(scraper, html)
+            if backend == 'html.parser':
+                baseline[path] = fields
+            elif fields != baseline[path]:
+                mismatches.append(path)
+
+        print(f"{backend:12} {per_page * 1000:8.2f} ms/page   "
+              f"{'identical fields' if not mismatches else f'{len(mismatches)} page(s) differ'}")
+        for path in mismatches:
+            print(f"  ✗ {path}")
+
+
+if __name__ == '__main__':
+    main()
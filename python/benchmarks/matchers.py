@@ -0,0 +1,64 @@
+"""
+Micro-benchmarks for the scraper heuristics in utils.matchers
+
+Usage (from the python/ directory):
+    python -m benchmarks.matchers [--number 100000]
+
+Prints the cost per call of each check next to the substring/keyword-list
+implementation it replaced.
+"""
+import argparse
+import re
+import timeit
+
+from utils.matchers import SKIP_DOMAINS, is_directory_url, is_sales_email
+
+
+URLS = [
+    'https://www.example-firm.fi',
+    'www.rakennus-virtanen.fi/yhteystiedot',
+    'https://www.finder.fi/Rakennusurakointi/Example+Oy/Helsinki/yhteystiedot/123',
+    '//duckduckgo.com/l/?uddg=https%3A%2F%2Fwww.example-firm.fi%2F&rut=abc',
+    'https://fi.linkedin.com/company/example',
+]
+EMAILS = ['matti.virtanen@example.fi', 'info@example.fi', 'myynti@example.fi', 'laskutus@example.fi']
+
+
+def legacy_is_valid_website(url, skip_domains=sorted(SKIP_DOMAINS)):
+    url_lower = url.lower()
+    return not any(domain in url_lower for domain in skip_domains)
+
+
+def legacy_is_sales_email(email):
+    email_lower = email.lower()
+    skip_keywords = ['info@', 'asiakaspalvelu@', 'customerservice@',
+                     'tuki@', 'support@', 'help@', 'helpdesk@']
+    if any(keyword in email_lower for keyword in skip_keywords):
+        return False
+    sales_keywords = ['myynti@', 'sales@', 'business@', 'b2b@',
+                      'yritys@', 'contact@', 'office@']
+    if any(keyword in email_lower for keyword in sales_keywords):
+        return True
+    if re.match(r'^[a-z]+\.[a-z]+@', email_lower):
+        return True
+    return True
+
+
+def bench(label, func, samples, number):
+    seconds = timeit.timeit(lambda: [func(sample) for sample in samples], number=number)
+    print(f"{label:28} {seconds / (number * len(samples)) * 1e6:8.3f} µs/call")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--number', type=int, default=100000, help='Repetitions over the samples')
+    args = arg_parser.parse_args()
+
+    bench('is_directory_url', is_directory_url, URLS, args.number)
+    bench('  substring scan (legacy)', legacy_is_valid_website, URLS, args.number)
+    bench('is_sales_email', is_sales_email, EMAILS, args.number)
+    bench('  keyword lists (legacy)', legacy_is_sales_email, EMAILS, args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 """
 Application configuration
 """
+import os
 
 BUSINESS_LINES = [
     # A - MAATALOUS, METSÄTALOUS JA KALATALOUS
@@ -136,4 +137,53 @@ BUSINESS_LINES = [
     
     # U - KANSAINVÄLISTEN ORGANISAATIOIDEN TOIMINTA
     {"code": "99", "name": "Kansainvälisten organisaatioiden ja toimielinten toiminta"}
-]
\ No newline at end of file
+]
+
+
+# Outgoing request budgets per host: (requests per second, burst size).
+# A host also matches its subdomains, e.g. 'finder.fi' covers 'www.finder.fi'.
+# Finder.fi is charged once per validated lead (its search request).
+RATE_LIMITS = {
+    'avoindata.prh.fi': (5, 5),
+    'finder.fi': (0.25, 1),
+    'html.duckduckgo.com': (0.5, 1),
+}
+
+# Budget for every other host (company websites), tracked per host
+DEFAULT_RATE_LIMIT = (1, 2)
+
+
+# Finder.fi cache: entries older than the TTL are refetched (keeps revenue/employee
+# figures fresh); above the size cap the least recently used entries are evicted.
+FINDER_CACHE_TTL_DAYS = float(os.getenv('FINDER_CACHE_TTL_DAYS', 90))
+FINDER_CACHE_MAX_ENTRIES = int(os.getenv('FINDER_CACHE_MAX_ENTRIES', 50000))
+
+# New cache entries are committed to disk every N entries or T seconds, whichever
+# comes first, so a crashed validation run keeps almost all of its lookups.
+FINDER_CACHE_CHECKPOINT_EVERY = int(os.getenv('FINDER_CACHE_CHECKPOINT_EVERY', 25))
+FINDER_CACHE_CHECKPOINT_SECONDS = float(os.getenv('FINDER_CACHE_CHECKPOINT_SECONDS', 30))
+
+# Companies are inserted into the database in batches of this many rows
+# (one multi-row INSERT per batch)
+DB_INSERT_BATCH_SIZE = int(os.getenv('DB_INSERT_BATCH_SIZE', 1000))
+
+# Database connection pool (one pool per backend process)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+# BeautifulSoup tree builder for every scraped page: 'lxml' (C parser, much
+# faster) or 'html.parser' (pure Python, no extra dependency). Falls back to
+# 'html.parser' when lxml is not installed.
+HTML_PARSER = os.getenv('HTML_PARSER', 'lxml')
+
+# Scrape, validation and enrichment results are kept in NDJSON files; the status
+# dict (polled by the frontend) only shows the count and this many latest leads.
+STATUS_RECENT_RESULTS = int(os.getenv('STATUS_RECENT_RESULTS', 50))
+
+# Company website fetches: only HTML is downloaded, streamed and cut off after
+# this many bytes, so one huge page cannot blow up a worker's memory.
+MAX_PAGE_BYTES = int(os.getenv('MAX_PAGE_BYTES', 2 * 1024 * 1024))
+FETCH_CHUNK_BYTES = int(os.getenv('FETCH_CHUNK_BYTES', 64 * 1024))
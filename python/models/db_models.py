@@ -1,11 +1,19 @@
 """
 Database models for PostgreSQL
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, JSON, Text, ForeignKey
+from sqlalchemy import bindparam, case, create_engine, func, select, event, inspect, text, DDL, Column, Integer, BigInteger, String, DateTime, Boolean, JSON, Text, ForeignKey, Index
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship
+from sqlalchemy.pool import QueuePool
+from utils.lead_metrics import derive_company_columns
+from config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+from collections import Counter
 from datetime import datetime
 import os
+import threading
+import time
 
 Base = declarative_base()
 
@@ -24,8 +32,13 @@ class ScrapeSession(Base):
     status = Column(String(50), default='completed')  # completed, failed, running
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    # Relationships
-    companies = relationship("Company", back_populates="session", cascade="all, delete-orphan")
+    # Scrape job parameters and resumable cursor:
+    # {'page': int, 'offset': int, 'processed': int}
+    params = Column(JSON)
+    cursor = Column(JSON)
+    
+    # Relationships (companies are shared between sessions through session_companies)
+    companies = relationship("Company", secondary="session_companies", viewonly=True)
     
     def to_dict(self):
         return {
@@ -37,19 +50,39 @@ class ScrapeSession(Base):
             'company_form': self.company_form,
             'total_companies': self.total_companies,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'resumable': bool(self.params) and self.status != 'completed',
+            'cursor': {
+                'page': self.cursor.get('page'),
+                'offset': self.cursor.get('offset'),
+                'processed': self.cursor.get('processed', len(self.cursor.get('processed_ids', [])))
+            } if self.cursor else None
         }
 
 
+class SessionCompany(Base):
+    """Membership of a company in a scrape session"""
+    __tablename__ = 'session_companies'
+    
+    session_id = Column(Integer, ForeignKey('scrape_sessions.id', ondelete='CASCADE'), primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id', ondelete='CASCADE'), primary_key=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Company(Base):
-    """Company information"""
+    """Company information, one row per business ID
+    
+    Saving a company again (from any session) updates this row; the sessions
+    a company was seen in are recorded in session_companies.
+    """
     __tablename__ = 'companies'
     
     id = Column(Integer, primary_key=True)
+    # Session that last saved this company
     session_id = Column(Integer, ForeignKey('scrape_sessions.id'), nullable=False, index=True)
     
     # Basic info
-    business_id = Column(String(20), nullable=False, index=True)
+    business_id = Column(String(20), nullable=False, unique=True, index=True)
     name = Column(String(255), nullable=False, index=True)
     company_form = Column(String(100))
     main_business_line = Column(String(255))
@@ -59,10 +92,10 @@ class Company(Base):
     status = Column(String(50))
     
     # Address (stored as JSON for flexibility)
-    address = Column(JSON)
+    address = Column(JSON(none_as_null=True))
     
     # Contact info (stored as JSON)
-    contact_info = Column(JSON)
+    contact_info = Column(JSON(none_as_null=True))
     
     # Finder.fi data (stored as JSON)
     # Structure: {
@@ -73,38 +106,290 @@ class Company(Base):
     #   'contact': {'address': str, 'phone': str, 'email': str},
     #   'key_people': [{'name': str, 'title': str, 'email': str}]
     # }
-    finder_data = Column(JSON)
+    finder_data = Column(JSON(none_as_null=True))
     
     # AI insights (stored as JSON)
-    ai_insights = Column(JSON)
+    ai_insights = Column(JSON(none_as_null=True))
+    
+    # Typed copies of frequently filtered JSON fields (utils.lead_metrics),
+    # kept in sync whenever the JSON is saved or updated
+    email_count = Column(Integer, index=True)
+    verified_on_finder = Column(Boolean, index=True)
+    revenue_eur = Column(BigInteger, index=True)
+    employee_count = Column(Integer, index=True)
+    financial_year = Column(Integer, index=True)
+    priority_score = Column(Integer, index=True)  # AI priority: 3 high, 2 medium, 1 low
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    session = relationship("ScrapeSession", back_populates="companies")
+    session = relationship("ScrapeSession")
+    
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index('ix_companies_created_at_id', 'created_at', 'id'),
+        Index('ix_companies_business_line_created_at_id', 'main_business_line_code', 'created_at', 'id'),
+        # Search (PostgreSQL only): trigram index for substring/similarity
+        # matches on name, Finnish full-text index on name and a pattern index
+        # for business ID prefix lookups
+        Index('ix_companies_name_trgm', 'name',
+              postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('ix_companies_name_fts', text("to_tsvector('finnish', name)"),
+              postgresql_using='gin').ddl_if(dialect='postgresql'),
+        Index('ix_companies_business_id_pattern', 'business_id',
+              postgresql_ops={'business_id': 'varchar_pattern_ops'}).ddl_if(dialect='postgresql'),
+    )
+    
+    # Serialized fields, in to_dict() order; 'city' comes from address
+    FIELDS = [
+        'id', 'session_id', 'business_id', 'name', 'company_form',
+        'main_business_line', 'main_business_line_code', 'website',
+        'registration_date', 'status', 'address', 'contact_info', 'finder_data',
+        'ai_insights', 'email_count', 'verified_on_finder', 'revenue_eur',
+        'employee_count', 'financial_year', 'priority_score', 'created_at', 'updated_at'
+    ]
+    
+    # Compact list view used by the dashboard
+    SUMMARY_FIELDS = [
+        'id', 'business_id', 'name', 'city', 'website', 'main_business_line_code',
+        'email_count', 'verified_on_finder', 'priority_score'
+    ]
+    
+    @classmethod
+    def columns_for(cls, fields):
+        """Columns to load to serialize `fields` (for load_only)"""
+        unknown = [f for f in fields if f not in cls.FIELDS and f != 'city']
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        names = {'address' if f == 'city' else f for f in fields}
+        # Keyset pagination needs the sort key of every row
+        names.update(('id', 'created_at'))
+        return [getattr(cls, name) for name in sorted(names)]
+    
+    def to_dict(self, fields=None):
+        """Serialize the company; with `fields`, only those fields
+        
+        Only the requested attributes are touched, so columns deferred with
+        load_only are not loaded.
+        """
+        data = {}
+        for field in fields or self.FIELDS:
+            if field == 'city':
+                value = (self.address or {}).get('city')
+            else:
+                value = getattr(self, field)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            data[field] = value
+        return data
+    
+    def to_summary_dict(self):
+        return self.to_dict(self.SUMMARY_FIELDS)
+
+
+class SessionStats(Base):
+    """Precomputed company counts of a scrape session (see refresh_session_stats)"""
+    __tablename__ = 'session_stats'
+    
+    session_id = Column(Integer, ForeignKey('scrape_sessions.id', ondelete='CASCADE'), primary_key=True)
+    total_companies = Column(Integer, default=0, nullable=False)
+    with_email = Column(Integer, default=0, nullable=False)
+    verified_on_finder = Column(Integer, default=0, nullable=False)
+    by_city = Column(JSON)  # {city: count}
+    updated_at = Column(DateTime, default=datetime.utcnow)
     
     def to_dict(self):
         return {
-            'id': self.id,
             'session_id': self.session_id,
-            'business_id': self.business_id,
-            'name': self.name,
-            'company_form': self.company_form,
-            'main_business_line': self.main_business_line,
-            'main_business_line_code': self.main_business_line_code,
-            'website': self.website,
-            'registration_date': self.registration_date,
-            'status': self.status,
-            'address': self.address,
-            'contact_info': self.contact_info,
-            'finder_data': self.finder_data,
-            'ai_insights': self.ai_insights,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'total_companies': self.total_companies,
+            'with_email': self.with_email,
+            'verified_on_finder': self.verified_on_finder,
+            'by_city': self.by_city or {},
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 
+class BusinessLineStats(Base):
+    """Precomputed company counts of a business line (see refresh_business_line_stats)"""
+    __tablename__ = 'business_line_stats'
+    
+    business_line_code = Column(String(10), primary_key=True)
+    total_companies = Column(Integer, default=0, nullable=False)
+    with_email = Column(Integer, default=0, nullable=False)
+    verified_on_finder = Column(Integer, default=0, nullable=False)
+    by_city = Column(JSON)  # {city: count}
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'business_line_code': self.business_line_code,
+            'total_companies': self.total_companies,
+            'with_email': self.with_email,
+            'verified_on_finder': self.verified_on_finder,
+            'by_city': self.by_city or {},
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+def _refresh_stats(conn, stats_table, key_column, keys, companies):
+    """Recompute the stats rows of `keys` from `companies` (a join exposing key_column)
+    
+    A full recount, used to fill the stats tables of an existing database;
+    writes keep them current with StatsDelta.
+    """
+    keys = [key for key in set(keys) if key is not None]
+    if not keys:
+        return
+    
+    city = Company.address['city'].as_string()
+    totals = conn.execute(
+        select(
+            key_column,
+            func.count(),
+            func.sum(case((Company.email_count > 0, 1), else_=0)),
+            func.sum(case((Company.verified_on_finder.is_(True), 1), else_=0))
+        ).select_from(companies).where(key_column.in_(keys)).group_by(key_column)
+    ).all()
+    cities = conn.execute(
+        select(key_column, city, func.count())
+        .select_from(companies).where(key_column.in_(keys)).group_by(key_column, city)
+    ).all()
+    
+    by_city = {key: {} for key in keys}
+    for key, city_name, count in cities:
+        by_city[key][city_name or 'Unknown'] = count
+    rows = {key: {'total_companies': 0, 'with_email': 0, 'verified_on_finder': 0} for key in keys}
+    for key, total, with_email, verified in totals:
+        rows[key] = {'total_companies': total, 'with_email': with_email or 0, 'verified_on_finder': verified or 0}
+    
+    table = stats_table.__table__
+    primary_key = table.primary_key.columns.values()[0]
+    now = datetime.utcnow()
+    conn.execute(table.delete().where(primary_key.in_(keys)))
+    conn.execute(table.insert(), [
+        {primary_key.name: key, **rows[key], 'by_city': by_city[key], 'updated_at': now}
+        for key in keys
+    ])
+
+
+def refresh_session_stats(conn, session_ids):
+    """Recompute SessionStats for the given sessions (sessions that no longer exist are skipped)"""
+    existing = conn.execute(
+        select(ScrapeSession.id).where(ScrapeSession.id.in_(set(session_ids)))
+    ).scalars().all()
+    companies = SessionCompany.__table__.join(Company.__table__, SessionCompany.company_id == Company.id)
+    _refresh_stats(conn, SessionStats, SessionCompany.session_id, existing, companies)
+
+
+def refresh_business_line_stats(conn, business_line_codes):
+    """Recompute BusinessLineStats for the given business line codes"""
+    _refresh_stats(conn, BusinessLineStats, Company.main_business_line_code,
+                   business_line_codes, Company.__table__)
+
+
+class StatsDelta:
+    """Change a write makes to SessionStats and BusinessLineStats
+    
+    Companies are counted out (sign -1) with their values and sessions before
+    the write and counted in (+1) after it; apply() then adds the net
+    differences to the stats rows with INSERT ... ON CONFLICT DO UPDATE
+    SET n = n + excluded.n, so the cost depends on the companies written, not
+    on the size of their sessions or business lines. The upsert locks each
+    stats row, which keeps concurrent writers from losing each other's counts.
+    """
+    
+    def __init__(self):
+        # {(stats table, key): [total_companies, with_email, verified_on_finder, Counter(city)]}
+        self.counts = {}
+    
+    def count(self, conn, company_ids, sign, batch_size=1000):
+        """Count the stored companies `company_ids` in (sign=1) or out (sign=-1)"""
+        company_ids = list(company_ids)
+        city = Company.address['city'].as_string()
+        for start in range(0, len(company_ids), batch_size):
+            batch = company_ids[start:start + batch_size]
+            sessions = {}
+            for company_id, session_id in conn.execute(
+                select(SessionCompany.company_id, SessionCompany.session_id)
+                .where(SessionCompany.company_id.in_(batch))
+            ):
+                sessions.setdefault(company_id, []).append(session_id)
+            
+            for company_id, business_line, email_count, verified, city_name in conn.execute(
+                select(Company.id, Company.main_business_line_code, Company.email_count,
+                       Company.verified_on_finder, city).where(Company.id.in_(batch))
+            ):
+                keys = [(SessionStats, session_id) for session_id in sessions.get(company_id, [])]
+                if business_line is not None:
+                    keys.append((BusinessLineStats, business_line))
+                for key in keys:
+                    counts = self.counts.setdefault(key, [0, 0, 0, Counter()])
+                    counts[0] += sign
+                    counts[1] += sign if (email_count or 0) > 0 else 0
+                    counts[2] += sign if verified is True else 0
+                    counts[3][city_name or 'Unknown'] += sign
+    
+    def apply(self, conn):
+        """Add the counted differences to the stats rows (creating missing rows)"""
+        now = datetime.utcnow()
+        for stats_table in (SessionStats, BusinessLineStats):
+            table = stats_table.__table__
+            primary_key = table.primary_key.columns.values()[0]
+            changes = {}
+            for (target, key), (total, with_email, verified, cities) in self.counts.items():
+                cities = {name: n for name, n in cities.items() if n}
+                if target is stats_table and (total or with_email or verified or cities):
+                    changes[key] = (total, with_email, verified, cities)
+            if not changes:
+                continue
+            
+            insert = (postgresql if conn.dialect.name == 'postgresql' else sqlite).insert(table)
+            conn.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[primary_key],
+                    set_={
+                        **{
+                            column: table.c[column] + insert.excluded[column]
+                            for column in ('total_companies', 'with_email', 'verified_on_finder')
+                        },
+                        'updated_at': insert.excluded.updated_at
+                    }
+                ),
+                [
+                    {primary_key.name: key, 'total_companies': total, 'with_email': with_email,
+                     'verified_on_finder': verified, 'by_city': {}, 'updated_at': now}
+                    for key, (total, with_email, verified, _) in changes.items()
+                ]
+            )
+            
+            # by_city is a JSON map: merged in Python under the row lock the upsert took
+            city_changes = {key: cities for key, (_, _, _, cities) in changes.items() if cities}
+            if city_changes:
+                merged = []
+                for key, by_city in conn.execute(
+                    select(primary_key, table.c.by_city)
+                    .where(primary_key.in_(list(city_changes))).with_for_update()
+                ):
+                    by_city = Counter(by_city or {})
+                    by_city.update(city_changes[key])
+                    merged.append({'key': key, 'new_by_city': {name: n for name, n in by_city.items() if n > 0}})
+                conn.execute(
+                    table.update().where(primary_key == bindparam('key'))
+                    .values(by_city=bindparam('new_by_city')),
+                    merged
+                )
+        self.counts.clear()
+
+
+# pg_trgm provides the gin_trgm_ops operator class and similarity()
+event.listen(
+    Base.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
+
 # Database connection
 def get_db_url():
     """Get database URL from environment or use default"""
@@ -114,15 +399,202 @@ def get_db_url():
     )
 
 
+# Columns added after the first release; create_all() only creates missing
+# tables, so these are added to existing tables by upgrade_schema()
+ADDED_COLUMNS = [
+    ('scrape_sessions', 'params', 'JSON'),
+    ('scrape_sessions', 'cursor', 'JSON'),
+    ('companies', 'email_count', 'INTEGER'),
+    ('companies', 'verified_on_finder', 'BOOLEAN'),
+    ('companies', 'revenue_eur', 'BIGINT'),
+    ('companies', 'employee_count', 'INTEGER'),
+    ('companies', 'financial_year', 'INTEGER'),
+    ('companies', 'priority_score', 'INTEGER'),
+]
+
+
+def upgrade_schema(engine):
+    """Add columns introduced after an existing database was created"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        added = set()
+        for table, column, column_type in ADDED_COLUMNS:
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}'))
+                added.add((table, column))
+        
+        if ('companies', 'email_count') in added:
+            _backfill_company_columns(conn)
+        
+        # Indexes declared on models after their table was created
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        
+        business_id_unique = any(
+            index['column_names'] == ['business_id'] and index['unique']
+            for index in inspector.get_indexes('companies')
+        )
+        if not business_id_unique:
+            _deduplicate_companies(conn)
+        
+        # Stats tables added to a database that already has companies
+        stats_empty = conn.execute(select(func.count()).select_from(SessionStats)).scalar() == 0
+        if stats_empty:
+            refresh_session_stats(conn, conn.execute(select(ScrapeSession.id)).scalars().all())
+            refresh_business_line_stats(
+                conn, conn.execute(select(Company.main_business_line_code).distinct()).scalars().all()
+            )
+
+
+def _backfill_company_columns(conn, batch_size=1000):
+    """Fill the typed company columns from the JSON data of existing rows"""
+    companies = Company.__table__
+    update = companies.update().where(companies.c.id == bindparam('row_id'))
+    last_id = 0
+    filled = 0
+    
+    while True:
+        rows = conn.execute(
+            companies.select()
+                     .with_only_columns(companies.c.id, companies.c.contact_info,
+                                        companies.c.finder_data, companies.c.ai_insights)
+                     .where(companies.c.id > last_id)
+                     .order_by(companies.c.id)
+                     .limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            break
+        conn.execute(update, [
+            {'row_id': row['id'], **derive_company_columns(row)} for row in rows
+        ])
+        last_id = rows[-1]['id']
+        filled += len(rows)
+    
+    if filled:
+        print(f"✓ Filled typed columns for {filled} companies")
+
+
+def _deduplicate_companies(conn):
+    """Migrate per-session company rows to one row per business ID
+    
+    Databases created before session_companies existed store a copy of a
+    company for every session. Each copy becomes a session membership of the
+    most recently saved copy, the other copies are deleted and business_id
+    gets its unique index.
+    """
+    conn.execute(text(
+        'INSERT INTO session_companies (session_id, company_id, created_at) '
+        'SELECT c.session_id, keep.id, MIN(c.created_at) FROM companies c '
+        'JOIN (SELECT business_id, MAX(id) AS id FROM companies GROUP BY business_id) keep '
+        '  ON keep.business_id = c.business_id '
+        'WHERE NOT EXISTS (SELECT 1 FROM session_companies sc '
+        '  WHERE sc.session_id = c.session_id AND sc.company_id = keep.id) '
+        'GROUP BY c.session_id, keep.id'
+    ))
+    removed = conn.execute(text(
+        'DELETE FROM companies WHERE id NOT IN '
+        '(SELECT MAX(id) FROM companies GROUP BY business_id)'
+    )).rowcount
+    conn.execute(text('DROP INDEX IF EXISTS ix_companies_business_id'))
+    conn.execute(text('CREATE UNIQUE INDEX ix_companies_business_id ON companies (business_id)'))
+    if removed:
+        print(f"✓ Merged {removed} duplicate company rows into session memberships")
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self.metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self.metrics_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+    
+    def stats(self):
+        with self.metrics_lock:
+            return {
+                'pool_size': self.size(),
+                'checked_out': self.checkedout(),
+                'checked_in': self.checkedin(),
+                'overflow': max(self.overflow(), 0),
+                'max_overflow': self._max_overflow,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.wait_max * 1000, 3)
+            }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+# Thread-local sessions; the Flask app removes the request's session on teardown
+Session = scoped_session(sessionmaker())
+
+
+def get_engine():
+    """Get the process-wide engine (and its connection pool)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                get_db_url(),
+                poolclass=TimedQueuePool,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING
+            )
+            Session.configure(bind=_engine)
+        return _engine
+
+
 def init_db():
     """Initialize database and create tables"""
-    engine = create_engine(get_db_url())
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    upgrade_schema(engine)
     return engine
 
 
-def get_session():
-    """Get database session"""
-    engine = create_engine(get_db_url())
-    Session = sessionmaker(bind=engine)
-    return Session()
+def get_session(scoped=True):
+    """Get database session
+    
+    By default this is the current thread's (request's) scoped session;
+    closing it returns its connection to the pool. scoped=False gives an
+    independent session, e.g. for a generator that outlives other calls.
+    """
+    engine = get_engine()
+    if scoped:
+        return Session()
+    return sessionmaker(bind=engine)()
+
+
+def remove_session():
+    """Close and discard the current thread's scoped session"""
+    Session.remove()
+
+
+def pool_stats():
+    """Connection pool usage and checkout wait times"""
+    return get_engine().pool.stats()
@@ -8,7 +8,9 @@ scraping_status = {
     'progress': 0,
     'total': 0,
     'current_company': '',
-    'results': []
+    'results': [],  # latest leads only, see results_file
+    'results_count': 0,
+    'results_file': None
 }
 
 validation_status = {
@@ -17,7 +19,10 @@ validation_status = {
     'total': 0,
     'current_company': '',
     'validated_count': 0,
-    'removed_count': 0
+    'removed_count': 0,
+    'concurrency': 0,
+    'throttle_rate': 0.0,
+    'observed_rate': 0.0
 }
 
 agent_status = {
@@ -1,12 +1,97 @@
 """
 REST API routes for database operations
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from services.db_service import DatabaseService
+from models.db_models import Company
+from utils.export_utils import iter_csv, iter_ndjson_lines, iter_parquet, pa
+from config import DB_INSERT_BATCH_SIZE
 
 db_bp = Blueprint('db', __name__, url_prefix='/api/db')
 
 
+def _fields_arg():
+    """Parse the fields= projection: a comma-separated field list or 'summary'"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    if fields == 'summary':
+        return Company.SUMMARY_FIELDS
+    return [f.strip() for f in fields.split(',') if f.strip()]
+
+
+def _bool_arg(name):
+    """Parse a true/false query parameter (None when absent)"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'Invalid value for {name}: {value}')
+
+
+@db_bp.route('/pool', methods=['GET'])
+def get_pool_stats():
+    """GET connection pool metrics: pool size, checked-out connections,
+    overflow in use, checkout count, timeouts and wait times
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'pool': DatabaseService.get_pool_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@db_bp.route('/stats/sessions/<int:session_id>', methods=['GET'])
+def get_session_stats(session_id):
+    """GET precomputed company counts of a session: total, with email,
+    verified on Finder.fi and by city
+    """
+    try:
+        stats = DatabaseService.get_session_stats(session_id)
+        if stats:
+            return jsonify({
+                'success': True,
+                'stats': stats
+            })
+        return jsonify({'success': False, 'error': 'Session not found'}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@db_bp.route('/stats/business-lines', methods=['GET'])
+def get_all_business_line_stats():
+    """GET precomputed company counts of every business line"""
+    try:
+        stats = DatabaseService.get_business_line_stats()
+        return jsonify({
+            'success': True,
+            'count': len(stats),
+            'stats': stats
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@db_bp.route('/stats/business-lines/<business_line_code>', methods=['GET'])
+def get_business_line_stats(business_line_code):
+    """GET precomputed company counts of a business line code"""
+    try:
+        stats = DatabaseService.get_business_line_stats(business_line_code)
+        if stats:
+            return jsonify({
+                'success': True,
+                'stats': stats
+            })
+        return jsonify({'success': False, 'error': 'Business line not found'}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @db_bp.route('/sessions', methods=['GET'])
 def get_sessions():
     """GET all scrape sessions
@@ -72,59 +157,152 @@ def delete_session(session_id):
 
 @db_bp.route('/companies', methods=['GET'])
 def get_companies():
-    """GET all companies with pagination
+    """GET all companies with pagination, newest first
     Query params:
         - limit: number of companies to return (default: 100)
-        - offset: pagination offset (default: 0)
+        - cursor: next_cursor of the previous page (keyset pagination)
+        - offset: legacy offset pagination; slower on deep pages
+        - fields: comma-separated fields to return, or "summary" (default: all)
     """
     try:
         limit = request.args.get('limit', 100, type=int)
-        offset = request.args.get('offset', 0, type=int)
-        companies = DatabaseService.get_all_companies(limit=limit, offset=offset)
+        cursor = request.args.get('cursor')
+        if 'offset' in request.args and not cursor:
+            offset = request.args.get('offset', 0, type=int)
+            companies = DatabaseService.get_all_companies(limit=limit, offset=offset, fields=_fields_arg())
+            next_cursor = None
+        else:
+            offset = None
+            companies, next_cursor = DatabaseService.get_companies_page(
+                limit=limit, cursor=cursor, fields=_fields_arg()
+            )
         return jsonify({
             'success': True,
             'count': len(companies),
             'limit': limit,
             'offset': offset,
+            'next_cursor': next_cursor,
+            'companies': companies
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+PRIORITIES = {'high': 3, 'medium': 2, 'low': 1}
+
+
+@db_bp.route('/companies/filter', methods=['GET'])
+def filter_companies():
+    """GET companies matching typed filters, newest first (evaluated in SQL)
+    Query params (all optional):
+        - has_email: true/false
+        - min_emails: minimum number of emails
+        - verified: verified on Finder.fi, true/false
+        - min_revenue, max_revenue: revenue in euros
+        - min_employees, max_employees
+        - financial_year
+        - min_priority: AI priority, high/medium/low
+        - business_line: business line code (prefix match)
+        - limit: page size (default: 100)
+        - cursor: next_cursor of the previous page
+        - fields: comma-separated fields to return, or "summary" (default: all)
+    """
+    try:
+        min_priority = request.args.get('min_priority')
+        if min_priority and min_priority.lower() not in PRIORITIES:
+            raise ValueError(f'Invalid value for min_priority: {min_priority}')
+        filters = {
+            'min_emails': request.args.get('min_emails', type=int),
+            'verified': _bool_arg('verified'),
+            'min_revenue': request.args.get('min_revenue', type=int),
+            'max_revenue': request.args.get('max_revenue', type=int),
+            'min_employees': request.args.get('min_employees', type=int),
+            'max_employees': request.args.get('max_employees', type=int),
+            'financial_year': request.args.get('financial_year', type=int),
+            'min_priority': PRIORITIES[min_priority.lower()] if min_priority else None,
+            'business_line': request.args.get('business_line'),
+            'has_email': _bool_arg('has_email'),
+        }
+        
+        limit = request.args.get('limit', 100, type=int)
+        companies, next_cursor = DatabaseService.get_companies_page(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            filters=filters,
+            fields=_fields_arg()
+        )
+        return jsonify({
+            'success': True,
+            'count': len(companies),
+            'limit': limit,
+            'next_cursor': next_cursor,
             'companies': companies
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @db_bp.route('/companies/session/<int:session_id>', methods=['GET'])
 def get_companies_by_session(session_id):
-    """GET all companies from a specific session"""
+    """GET all companies from a specific session
+    Query params (optional, to page through large sessions):
+        - limit: number of companies per page
+        - cursor: next_cursor of the previous page
+        - fields: comma-separated fields to return, or "summary" (default: all)
+    """
     try:
-        companies = DatabaseService.get_companies_by_session(session_id)
+        if 'limit' in request.args or 'cursor' in request.args:
+            companies, next_cursor = DatabaseService.get_companies_page(
+                limit=request.args.get('limit', 100, type=int),
+                cursor=request.args.get('cursor'),
+                session_id=session_id,
+                fields=_fields_arg()
+            )
+        else:
+            companies = DatabaseService.get_companies_by_session(session_id, fields=_fields_arg())
+            next_cursor = None
         return jsonify({
             'success': True,
             'session_id': session_id,
             'count': len(companies),
+            'next_cursor': next_cursor,
             'companies': companies
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @db_bp.route('/companies/business-line/<business_line_code>', methods=['GET'])
 def get_companies_by_business_line(business_line_code):
-    """GET companies by business line code
+    """GET companies by business line code, newest first
     Query params:
         - limit: number of companies to return (default: 100)
+        - cursor: next_cursor of the previous page
+        - fields: comma-separated fields to return, or "summary" (default: all)
     """
     try:
         limit = request.args.get('limit', 100, type=int)
-        companies = DatabaseService.get_companies_by_business_line(
-            business_line_code, 
-            limit=limit
+        companies, next_cursor = DatabaseService.get_companies_page(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            business_line_code=business_line_code,
+            fields=_fields_arg()
         )
         return jsonify({
             'success': True,
             'business_line_code': business_line_code,
             'count': len(companies),
+            'next_cursor': next_cursor,
             'companies': companies
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -134,15 +312,18 @@ def get_latest_results():
     """GET latest scraping results (from most recent session)
     Query params:
         - limit: number of companies to return (default: 50)
+        - fields: comma-separated fields to return, or "summary" (default: all)
     """
     try:
         limit = request.args.get('limit', 50, type=int)
-        companies = DatabaseService.get_latest_results(limit=limit)
+        companies = DatabaseService.get_latest_results(limit=limit, fields=_fields_arg())
         return jsonify({
             'success': True,
             'count': len(companies),
             'companies': companies
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -153,6 +334,7 @@ def search_companies():
     Query params:
         - q: search query
         - limit: number of results (default: 50)
+        - fields: comma-separated fields to return, or "summary" (default: all)
     """
     try:
         query = request.args.get('q', '')
@@ -164,13 +346,111 @@ def search_companies():
                 'error': 'Search query (q) is required'
             }), 400
         
-        companies = DatabaseService.search_companies(query, limit=limit)
+        companies = DatabaseService.search_companies(query, limit=limit, fields=_fields_arg())
         return jsonify({
             'success': True,
             'query': query,
             'count': len(companies),
             'companies': companies
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv', 'csv'),
+    'ndjson': (iter_ndjson_lines, 'application/x-ndjson', 'ndjson'),
+    'parquet': (iter_parquet, 'application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def _export_response(basename, **filters):
+    """Stream companies matching `filters` in the requested format"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f'Unsupported format: {export_format} (use csv, ndjson or parquet)'
+        }), 400
+    if export_format == 'parquet' and pa is None:
+        return jsonify({
+            'success': False,
+            'error': 'Parquet export requires the pyarrow package'
+        }), 501
+    
+    exporter, mimetype, extension = EXPORT_FORMATS[export_format]
+    batch_size = request.args.get('batch_size', 1000, type=int)
+    companies = DatabaseService.iter_companies(batch_size=batch_size, **filters)
+    
+    return Response(
+        stream_with_context(exporter(companies)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={basename}.{extension}'}
+    )
+
+
+@db_bp.route('/sessions/<int:session_id>/export', methods=['GET'])
+def export_session(session_id):
+    """Stream all companies of a session as a file download
+    Query params:
+        - format: csv (default), ndjson or parquet
+        - batch_size: rows fetched per database round trip (default: 1000)
+    """
+    try:
+        return _export_response(f'session_{session_id}', session_id=session_id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@db_bp.route('/companies/export', methods=['GET'])
+def export_companies():
+    """Stream a filtered set of companies as a file download
+    Query params:
+        - format: csv (default), ndjson or parquet
+        - session_id: only companies of this session
+        - business_line: business line code (prefix match)
+        - status: company status
+        - q: name or business ID contains
+        - batch_size: rows fetched per database round trip (default: 1000)
+    """
+    try:
+        return _export_response(
+            'companies',
+            session_id=request.args.get('session_id', type=int),
+            business_line_code=request.args.get('business_line'),
+            status=request.args.get('status'),
+            query=request.args.get('q')
+        )
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@db_bp.route('/companies/batch', methods=['PUT'])
+def update_companies_batch():
+    """UPDATE many companies in one request and one transaction
+    Body:
+        - updates: list of {"id": company id, "updates": {field: value}}
+    Returns a result per item; invalid items fail without affecting the others.
+    """
+    try:
+        data = request.json or {}
+        items = data.get('updates')
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'success': False,
+                'error': 'No updates provided'
+            }), 400
+        
+        results = DatabaseService.update_companies(items)
+        updated = sum(1 for r in results if r['success'])
+        return jsonify({
+            'success': True,
+            'updated': updated,
+            'failed': len(results) - updated,
+            'results': results
+        })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -207,6 +487,9 @@ def save_current_results():
         - business_line_name: optional
         - location: optional
         - company_form: optional
+        - batch_size: optional positive integer, rows per INSERT statement
+        - session_id: optional, session of the scrape job that produced the
+          results (saved into it instead of a new session)
     """
     try:
         data = request.json
@@ -218,33 +501,55 @@ def save_current_results():
                 'error': 'No companies to save'
             }), 400
         
-        # Create session
-        session = DatabaseService.create_session(
-            business_line=data.get('business_line'),
-            business_line_name=data.get('business_line_name'),
-            location=data.get('location'),
-            company_form=data.get('company_form')
-        )
+        batch_size = data.get('batch_size')
+        if batch_size is None:
+            batch_size = DB_INSERT_BATCH_SIZE
+        elif isinstance(batch_size, bool) or not isinstance(batch_size, int) or batch_size < 1:
+            return jsonify({
+                'success': False,
+                'error': 'batch_size must be a positive integer'
+            }), 400
+        
+        # Results of a scrape job belong to the job's own session
+        session_id = data.get('session_id')
+        if session_id is not None:
+            session = DatabaseService.get_session_by_id(session_id)
+            if not session:
+                return jsonify({
+                    'success': False,
+                    'error': 'Session not found'
+                }), 404
+        else:
+            # Create session
+            session = DatabaseService.create_session(
+                business_line=data.get('business_line'),
+                business_line_name=data.get('business_line_name'),
+                location=data.get('location'),
+                company_form=data.get('company_form')
+            ).to_dict()
         
         # Save companies
-        saved_companies = DatabaseService.save_companies(
-            session.id, 
-            companies_data
+        saved = DatabaseService.save_companies(
+            session['id'], 
+            companies_data,
+            batch_size=batch_size
         )
         
-        # Mark session as completed
-        DatabaseService.complete_session(
-            session.id, 
-            len(saved_companies),
-            status='completed'
-        )
+        # Mark a new session as completed (a job session keeps the job's status)
+        if session_id is None:
+            DatabaseService.complete_session(
+                session['id'], 
+                saved['count'],
+                status='completed'
+            )
         
         return jsonify({
             'success': True,
-            'message': f'Saved {len(saved_companies)} companies',
-            'session_id': session.id,
-            'timestamp': session.timestamp.isoformat(),
-            'count': len(saved_companies)
+            'message': f'Saved {saved["count"]} companies',
+            'session_id': session['id'],
+            'timestamp': session['timestamp'],
+            'count': saved['count'],
+            'ids': saved['ids']
         })
         
     except Exception as e:
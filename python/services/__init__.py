@@ -4,13 +4,14 @@ Services package for business logic
 from .finder_service import validate_company_on_finder, run_finder_validation
 from .scraper_service import run_scraper
 from .enrichment_service import run_agent_enrichment
-from .cache_service import load_finder_cache, save_finder_cache
+from .cache_service import FinderCache, load_finder_cache, save_finder_cache
 
 __all__ = [
     'validate_company_on_finder',
     'run_finder_validation',
     'run_scraper',
     'run_agent_enrichment',
+    'FinderCache',
     'load_finder_cache',
     'save_finder_cache',
 ]
@@ -1,28 +1,269 @@
 """
 Cache management for Finder.fi data
 """
+import atexit
 import json
 import os
+import sqlite3
+import threading
+import time
+from config import (
+    FINDER_CACHE_TTL_DAYS, FINDER_CACHE_MAX_ENTRIES,
+    FINDER_CACHE_CHECKPOINT_EVERY, FINDER_CACHE_CHECKPOINT_SECONDS
+)
 
 
-def load_finder_cache():
-    """Load Finder.fi cache from file"""
-    cache_file = 'finder_cache.json'
-    if os.path.exists(cache_file):
+CACHE_DB_FILE = 'finder_cache.db'
+LEGACY_CACHE_FILE = 'finder_cache.json'
+
+
+class FinderCache:
+    """SQLite-backed Finder.fi cache keyed by business ID
+
+    Supports the dict operations the services use (`in`, `[]`, `get`, `len`)
+    with indexed single-row reads and writes instead of loading and rewriting a
+    whole JSON file. A legacy finder_cache.json is imported on first open and
+    renamed to finder_cache.json.migrated.
+
+    Every entry carries its fetch time and last access time. Entries older than
+    `ttl_seconds` count as misses and are dropped, and once the cache holds more
+    than `max_entries` the least recently used entries are evicted.
+
+    Writes are grouped into transactions that are committed (checkpointed) every
+    `checkpoint_every` writes or `checkpoint_interval` seconds. SQLite commits
+    are atomic, so a crash loses at most the last uncommitted batch and never
+    leaves a half-written cache behind.
+    """
+
+    def __init__(self, path=CACHE_DB_FILE, legacy_path=LEGACY_CACHE_FILE,
+                 ttl_seconds=FINDER_CACHE_TTL_DAYS * 86400, max_entries=FINDER_CACHE_MAX_ENTRIES,
+                 checkpoint_every=FINDER_CACHE_CHECKPOINT_EVERY,
+                 checkpoint_interval=FINDER_CACHE_CHECKPOINT_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self.pending_writes = 0
+        self.last_checkpoint = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS finder_cache ('
+            ' business_id TEXT PRIMARY KEY,'
+            ' data TEXT NOT NULL)'
+        )
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(finder_cache)')}
+        for column in ('fetched_at', 'accessed_at'):
+            if column not in columns:
+                self.conn.execute(f'ALTER TABLE finder_cache ADD COLUMN {column} REAL NOT NULL DEFAULT 0')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_finder_cache_accessed_at ON finder_cache (accessed_at)'
+        )
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_finder_cache_fetched_at ON finder_cache (fetched_at)'
+        )
+        self.conn.commit()
+        if legacy_path:
+            self._migrate_legacy(legacy_path)
+        self.purge_expired()
+        self.count = self.conn.execute('SELECT COUNT(*) FROM finder_cache').fetchone()[0]
+        self._evict_over_capacity()
+
+    def _migrate_legacy(self, legacy_path):
+        """One-time import of the old whole-file JSON cache"""
+        if not os.path.exists(legacy_path):
+            return
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            # The old file has no per-entry timestamps; its last write is the best guess
+            fetched_at = os.path.getmtime(legacy_path)
+            with self.lock:
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO finder_cache (business_id, data, fetched_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    ((key, json.dumps(value, ensure_ascii=False), fetched_at, fetched_at)
+                     for key, value in legacy.items())
+                )
+                self.conn.commit()
+            os.replace(legacy_path, legacy_path + '.migrated')
+            print(f"✓ Migrated {len(legacy)} Finder.fi cache entries from {legacy_path}")
+        except Exception as e:
+            print(f"Error migrating cache from {legacy_path}: {e}")
+
+    def _is_expired(self, fetched_at, now):
+        return bool(self.ttl_seconds) and fetched_at < now - self.ttl_seconds
+
+    def purge_expired(self):
+        """Delete every entry older than the TTL"""
+        if not self.ttl_seconds:
+            return 0
+        with self.lock:
+            deleted = self.conn.execute(
+                'DELETE FROM finder_cache WHERE fetched_at < ?', (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self.conn.commit()
+            self.expirations += deleted
+            return deleted
+
+    def _evict_over_capacity(self):
+        """Drop least recently used entries above max_entries"""
+        excess = self.count - self.max_entries if self.max_entries else 0
+        if excess <= 0:
+            return
+        deleted = self.conn.execute(
+            'DELETE FROM finder_cache WHERE business_id IN ('
+            ' SELECT business_id FROM finder_cache ORDER BY accessed_at LIMIT ?)',
+            (excess,)
+        ).rowcount
+        self.count -= deleted
+        self.evictions += deleted
+
+    def get(self, business_id, default=None):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT data, fetched_at FROM finder_cache WHERE business_id = ?', (business_id,)
+            ).fetchone()
+            if row and self._is_expired(row[1], now):
+                self.conn.execute('DELETE FROM finder_cache WHERE business_id = ?', (business_id,))
+                self.count -= 1
+                self.expirations += 1
+                row = None
+            if not row:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.conn.execute(
+                'UPDATE finder_cache SET accessed_at = ? WHERE business_id = ?', (now, business_id)
+            )
+            self._maybe_checkpoint(new_entries=0)
+        return json.loads(row[0])
+
+    def put(self, business_id, finder_data):
+        now = time.time()
+        with self.lock:
+            exists = self.conn.execute(
+                'SELECT 1 FROM finder_cache WHERE business_id = ?', (business_id,)
+            ).fetchone() is not None
+            self.conn.execute(
+                'INSERT OR REPLACE INTO finder_cache (business_id, data, fetched_at, accessed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (business_id, json.dumps(finder_data, ensure_ascii=False), now, now)
+            )
+            if not exists:
+                self.count += 1
+                self._evict_over_capacity()
+            self._maybe_checkpoint(new_entries=1)
+
+    def _maybe_checkpoint(self, new_entries):
+        """Commit pending writes once enough entries or time have accumulated"""
+        self.pending_writes += new_entries
+        if (self.pending_writes >= self.checkpoint_every or
+                time.monotonic() - self.last_checkpoint >= self.checkpoint_interval):
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Atomically commit every pending write to disk"""
+        with self.lock:
+            self.conn.commit()
+            self.pending_writes = 0
+            self.last_checkpoint = time.monotonic()
+
+    def __getitem__(self, business_id):
+        value = self.get(business_id)
+        if value is None:
+            raise KeyError(business_id)
+        return value
+
+    def __setitem__(self, business_id, finder_data):
+        self.put(business_id, finder_data)
+
+    def __contains__(self, business_id):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT fetched_at FROM finder_cache WHERE business_id = ?', (business_id,)
+            ).fetchone()
+        return row is not None and not self._is_expired(row[0], time.time())
+
+    def __len__(self):
+        return self.count
+
+    def size_bytes(self):
+        """Size of the cache on disk, including the write-ahead log"""
+        return sum(
+            os.path.getsize(self.path + suffix)
+            for suffix in ('', '-wal', '-shm')
+            if os.path.exists(self.path + suffix)
+        )
+
+    def stats(self):
+        """Entry count, size and hit/miss/eviction counters since the process started"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': self.count,
+            'size_kb': self.size_bytes() / 1024,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'expirations': self.expirations,
+            'evictions': self.evictions,
+            'ttl_days': self.ttl_seconds / 86400 if self.ttl_seconds else None,
+            'max_entries': self.max_entries or None
+        }
+
+    def commit(self):
+        self.checkpoint()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute('DELETE FROM finder_cache')
+            self.conn.commit()
+            self.conn.execute('VACUUM')
+            self.count = 0
+            self.pending_writes = 0
+
+    def close(self):
+        with self.lock:
+            self.checkpoint()
+            self.conn.close()
+
+
+_finder_cache = None
+_finder_cache_lock = threading.Lock()
+
+
+def load_finder_cache():
+    """Get the process-wide Finder.fi cache store"""
+    global _finder_cache
+    with _finder_cache_lock:
+        if _finder_cache is None:
+            _finder_cache = FinderCache()
+            # Flush the last partial batch on a clean shutdown
+            atexit.register(_finder_cache.checkpoint)
+        return _finder_cache
 
 
 def save_finder_cache(cache):
-    """Save Finder.fi cache to file"""
-    cache_file = 'finder_cache.json'
+    """Persist Finder.fi cache entries
+
+    For a FinderCache this checkpoints the writes not yet committed by the
+    periodic checkpoints. A plain dict is merged into the store.
+    """
     try:
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
+        if isinstance(cache, FinderCache):
+            cache.commit()
+            return
+        store = load_finder_cache()
+        for business_id, finder_data in cache.items():
+            store.put(business_id, finder_data)
+        store.checkpoint()
     except Exception as e:
         print(f"Error saving cache: {e}")
-        
\ No newline at end of file
@@ -1,18 +1,139 @@
 """
 Database service for storing and retrieving scraping results
 """
-from models.db_models import ScrapeSession, Company, get_session
+from models.db_models import (
+    ScrapeSession, Company, SessionCompany, SessionStats, BusinessLineStats,
+    StatsDelta, get_session, pool_stats
+)
+from config import DB_INSERT_BATCH_SIZE
+from utils.lead_metrics import DERIVED_COLUMNS, derive_company_columns
 from datetime import datetime
-from sqlalchemy import desc
+from sqlalchemy import case, desc, func, literal_column, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import load_only
+import base64
+import json
+import re
+
+
+# Company fields kept from the stored row when a new save leaves them empty
+MERGED_FIELDS = [
+    'company_form', 'main_business_line', 'main_business_line_code', 'website',
+    'registration_date', 'status', 'address', 'contact_info', 'finder_data', 'ai_insights',
+    'email_count', 'verified_on_finder', 'revenue_eur', 'employee_count',
+    'financial_year', 'priority_score'
+]
+
+# Filters on the typed company columns: name -> (column, comparison)
+COMPANY_FILTERS = {
+    'has_email': (Company.email_count, 'positive'),
+    'min_emails': (Company.email_count, '>='),
+    'verified': (Company.verified_on_finder, '=='),
+    'min_revenue': (Company.revenue_eur, '>='),
+    'max_revenue': (Company.revenue_eur, '<='),
+    'min_employees': (Company.employee_count, '>='),
+    'max_employees': (Company.employee_count, '<='),
+    'financial_year': (Company.financial_year, '=='),
+    'min_priority': (Company.priority_score, '>='),
+    'business_line': (Company.main_business_line_code, 'startswith'),
+}
+
+
+def _apply_filters(companies, filters):
+    """Add a WHERE clause for each given COMPANY_FILTERS value"""
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        column, comparison = COMPANY_FILTERS[name]
+        if comparison == '>=':
+            companies = companies.filter(column >= value)
+        elif comparison == '<=':
+            companies = companies.filter(column <= value)
+        elif comparison == 'startswith':
+            companies = companies.filter(column.startswith(value, autoescape=True))
+        elif comparison == 'positive':
+            companies = companies.filter(column > 0 if value else or_(column.is_(None), column == 0))
+        else:
+            companies = companies.filter(column == value)
+    return companies
+
+
+def _encode_cursor(values):
+    """Opaque page token for the sort key values of the last row on a page"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+# Business IDs are digits with a hyphen (1234567-8)
+BUSINESS_ID_PREFIX = re.compile(r'^\d[\d-]*$')
+
+
+def _search_condition(db, query):
+    """Filter matching companies by name or business ID
+    
+    On PostgreSQL the name is matched as a substring (served by the pg_trgm
+    index) or by Finnish full-text search, and the business ID by prefix
+    (pattern index). Other databases fall back to substring matches.
+    """
+    if db.get_bind().dialect.name != 'postgresql':
+        return or_(
+            Company.name.icontains(query, autoescape=True),
+            Company.business_id.icontains(query, autoescape=True)
+        )
+    return or_(
+        Company.name.icontains(query, autoescape=True),
+        _name_tsvector().op('@@')(_tsquery(query)),
+        Company.business_id.startswith(query, autoescape=True)
+    )
+
+
+def _name_tsvector():
+    # Same expression as the ix_companies_name_fts index
+    return func.to_tsvector(literal_column("'finnish'"), Company.name)
+
+
+def _tsquery(query):
+    return func.plainto_tsquery(literal_column("'finnish'"), query)
+
+
+def _company_query(db, fields=None):
+    """Company query that loads only the columns needed for `fields`"""
+    companies = db.query(Company)
+    if fields:
+        companies = companies.options(load_only(*Company.columns_for(fields)))
+    return companies
+
+
+def _dialect_insert(db, table):
+    """INSERT construct with ON CONFLICT support for the session's database"""
+    if db.get_bind().dialect.name == 'sqlite':
+        return sqlite.insert(table)
+    return postgresql.insert(table)
 
 
 class DatabaseService:
     """Service for database operations"""
     
+    @staticmethod
+    def get_pool_stats():
+        """Connection pool metrics of this backend process"""
+        return pool_stats()
+    
     @staticmethod
     def create_session(business_line=None, business_line_name=None, 
-                      location=None, company_form=None):
-        """Create a new scrape session"""
+                      location=None, company_form=None, params=None):
+        """Create a new scrape session
+        
+        params: scrape job parameters, stored so the job can be resumed
+        """
         db = get_session()
         try:
             session = ScrapeSession(
@@ -21,7 +142,8 @@ class DatabaseService:
                 business_line_name=business_line_name,
                 location=location,
                 company_form=company_form,
-                status='running'
+                status='running',
+                params=params
             )
             db.add(session)
             db.commit()
@@ -44,32 +166,132 @@ class DatabaseService:
             db.close()
     
     @staticmethod
-    def save_companies(session_id, companies_data):
-        """Save companies to database"""
+    def update_session_cursor(session_id, cursor, status=None):
+        """Save the resumable cursor of a running scrape job
+        
+        total_companies is left alone: it counts the companies saved to the
+        session, which the job's results only become through save_companies.
+        """
         db = get_session()
         try:
-            saved_companies = []
+            session = db.query(ScrapeSession).filter_by(id=session_id).first()
+            if session:
+                session.cursor = cursor
+                if status:
+                    session.status = status
+                db.commit()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_scrape_state(session_id):
+        """Get the parameters, cursor and status needed to resume a scrape job"""
+        db = get_session()
+        try:
+            session = db.query(ScrapeSession).filter_by(id=session_id).first()
+            if session:
+                return {
+                    'params': session.params,
+                    'cursor': session.cursor or {},
+                    'status': session.status
+                }
+            return None
+        finally:
+            db.close()
+    
+    @staticmethod
+    def save_companies(session_id, companies_data, batch_size=DB_INSERT_BATCH_SIZE):
+        """Save companies to database
+        
+        Companies are upserted by business ID with batched multi-row
+        INSERT ... ON CONFLICT (business_id) DO UPDATE statements (batch_size
+        rows per statement) in a single transaction, and linked to the session
+        in session_companies. Fields missing from the new data keep their
+        stored values. Returns {'count': int, 'ids': [int]} with one id per
+        unique business ID, in input order.
+        
+        The stats of every session containing a saved company and of every
+        business line it moved out of or into are updated with the difference
+        in the same transaction, and the session's total_companies is set to the number of
+        companies linked to it (a session can be saved to more than once).
+        """
+        db = get_session()
+        try:
+            now = datetime.utcnow()
+            statement = _dialect_insert(db, Company)
+            statement = statement.on_conflict_do_update(
+                index_elements=[Company.business_id],
+                set_={
+                    'session_id': statement.excluded.session_id,
+                    'name': statement.excluded.name,
+                    'updated_at': statement.excluded.updated_at,
+                    **{
+                        field: func.coalesce(statement.excluded[field], Company.__table__.c[field])
+                        for field in MERGED_FIELDS
+                    }
+                }
+            ).returning(Company.id, sort_by_parameter_order=True)
+            link_statement = _dialect_insert(db, SessionCompany).on_conflict_do_nothing()
+            ids = []
+            batch = {}
+            stats = StatsDelta()
+            
+            def flush():
+                # Stored versions of these companies are counted out, the saved ones back in
+                stats.count(db.connection(), db.scalars(
+                    select(Company.id).where(Company.business_id.in_(list(batch)))
+                ), -1)
+                
+                # ON CONFLICT cannot touch the same row twice in one statement,
+                # so a batch holds each business ID once (the last occurrence wins)
+                batch_ids = db.scalars(statement, list(batch.values())).all()
+                db.execute(link_statement, [
+                    {'session_id': session_id, 'company_id': company_id, 'created_at': now}
+                    for company_id in batch_ids
+                ])
+                stats.count(db.connection(), batch_ids, 1)
+                ids.extend(batch_ids)
+                batch.clear()
+            
             for company_data in companies_data:
-                company = Company(
-                    session_id=session_id,
-                    business_id=company_data.get('business_id'),
-                    name=company_data.get('name'),
-                    company_form=company_data.get('company_form'),
-                    main_business_line=company_data.get('main_business_line'),
-                    main_business_line_code=company_data.get('main_business_line_code'),
-                    website=company_data.get('website'),
-                    registration_date=company_data.get('registration_date'),
-                    status=company_data.get('status'),
-                    address=company_data.get('address'),
-                    contact_info=company_data.get('contact_info'),
-                    finder_data=company_data.get('finder_data'),
-                    ai_insights=company_data.get('ai_insights')
-                )
-                db.add(company)
-                saved_companies.append(company)
+                business_id = company_data.get('business_id')
+                if business_id in batch:
+                    del batch[business_id]
+                batch[business_id] = {
+                    'session_id': session_id,
+                    'business_id': business_id,
+                    'name': company_data.get('name'),
+                    'company_form': company_data.get('company_form'),
+                    'main_business_line': company_data.get('main_business_line'),
+                    'main_business_line_code': company_data.get('main_business_line_code'),
+                    'website': company_data.get('website'),
+                    'registration_date': company_data.get('registration_date'),
+                    'status': company_data.get('status'),
+                    'address': company_data.get('address'),
+                    'contact_info': company_data.get('contact_info'),
+                    'finder_data': company_data.get('finder_data'),
+                    'ai_insights': company_data.get('ai_insights'),
+                    **derive_company_columns(company_data),
+                    'created_at': now,
+                    'updated_at': now
+                }
+                if len(batch) >= batch_size:
+                    flush()
+            
+            if batch:
+                flush()
             
+            db.execute(
+                update(ScrapeSession)
+                .where(ScrapeSession.id == session_id)
+                .values(total_companies=select(func.count()).where(SessionCompany.session_id == session_id)
+                        .scalar_subquery())
+            )
+            stats.apply(db.connection())
             db.commit()
-            return [c.to_dict() for c in saved_companies]
+            # A business ID repeated across batches is linked once
+            ids = list(dict.fromkeys(ids))
+            return {'count': len(ids), 'ids': ids}
         except Exception as e:
             db.rollback()
             raise e
@@ -116,33 +338,20 @@ class DatabaseService:
             db.close()
     
     @staticmethod
-    def get_companies_by_session(session_id):
+    def get_companies_by_session(session_id, fields=None):
         """Get all companies from a specific session"""
         db = get_session()
         try:
-            companies = db.query(Company)\
-                         .filter_by(session_id=session_id)\
-                         .all()
-            return [c.to_dict() for c in companies]
-        finally:
-            db.close()
-    
-    @staticmethod
-    def get_companies_by_business_line(business_line_code, limit=100):
-        """Get companies by business line code from latest sessions"""
-        db = get_session()
-        try:
-            companies = db.query(Company)\
-                         .filter_by(main_business_line_code=business_line_code)\
-                         .order_by(desc(Company.created_at))\
-                         .limit(limit)\
+            companies = _company_query(db, fields)\
+                         .join(SessionCompany, SessionCompany.company_id == Company.id)\
+                         .filter(SessionCompany.session_id == session_id)\
                          .all()
-            return [c.to_dict() for c in companies]
+            return [c.to_dict(fields) for c in companies]
         finally:
             db.close()
     
     @staticmethod
-    def get_latest_results(limit=50):
+    def get_latest_results(limit=50, fields=None):
         """Get latest scraping results (companies from most recent session)"""
         db = get_session()
         try:
@@ -155,54 +364,184 @@ class DatabaseService:
                 return []
             
             # Get companies from that session
-            companies = db.query(Company)\
-                         .filter_by(session_id=latest_session.id)\
+            companies = _company_query(db, fields)\
+                         .join(SessionCompany, SessionCompany.company_id == Company.id)\
+                         .filter(SessionCompany.session_id == latest_session.id)\
                          .limit(limit)\
                          .all()
             
-            return [c.to_dict() for c in companies]
+            return [c.to_dict(fields) for c in companies]
         finally:
             db.close()
     
     @staticmethod
-    def get_all_companies(limit=100, offset=0):
+    def get_all_companies(limit=100, offset=0, fields=None):
         """Get all companies with pagination"""
         db = get_session()
         try:
-            companies = db.query(Company)\
+            companies = _company_query(db, fields)\
                          .order_by(desc(Company.created_at))\
                          .limit(limit)\
                          .offset(offset)\
                          .all()
-            return [c.to_dict() for c in companies]
+            return [c.to_dict(fields) for c in companies]
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_companies_page(limit=100, cursor=None, session_id=None, business_line_code=None,
+                           filters=None, fields=None):
+        """Get one page of companies with keyset (cursor) pagination
+        
+        Companies are ordered newest first by (created_at, id); a session's
+        companies are ordered by company id. Each page starts right after the
+        row encoded in `cursor` using an index seek, so deep pages cost the
+        same as the first one. Returns (companies, next_cursor); next_cursor
+        is None on the last page. Raises ValueError for a malformed cursor.
+        
+        filters: optional COMPANY_FILTERS values, evaluated in SQL on the
+        indexed typed columns
+        """
+        db = get_session()
+        try:
+            companies = _apply_filters(_company_query(db, fields), filters)
+            if session_id is not None:
+                companies = companies.join(SessionCompany, SessionCompany.company_id == Company.id)\
+                                     .filter(SessionCompany.session_id == session_id)
+                if cursor:
+                    try:
+                        (last_id,) = _decode_cursor(cursor)
+                        last_id = int(last_id)
+                    except (TypeError, ValueError):
+                        # Valid base64 JSON of the wrong shape ('MQ' is 1)
+                        raise ValueError('Invalid cursor')
+                    companies = companies.filter(SessionCompany.company_id > last_id)
+                companies = companies.order_by(SessionCompany.company_id)
+                
+                def sort_key(company):
+                    return [company.id]
+            else:
+                if business_line_code:
+                    companies = companies.filter(Company.main_business_line_code == business_line_code)
+                if cursor:
+                    try:
+                        last_created_at, last_id = _decode_cursor(cursor)
+                        last_created_at, last_id = datetime.fromisoformat(last_created_at), int(last_id)
+                    except (TypeError, ValueError):
+                        raise ValueError('Invalid cursor')
+                    companies = companies.filter(
+                        tuple_(Company.created_at, Company.id) < tuple_(last_created_at, last_id)
+                    )
+                companies = companies.order_by(desc(Company.created_at), desc(Company.id))
+                
+                def sort_key(company):
+                    return [company.created_at.isoformat(), company.id]
+            
+            # One extra row tells whether there is a next page
+            rows = companies.limit(limit + 1).all()
+            next_cursor = _encode_cursor(sort_key(rows[limit - 1])) if len(rows) > limit else None
+            return [c.to_dict(fields) for c in rows[:limit]], next_cursor
+        finally:
+            db.close()
+    
+    @staticmethod
+    def iter_companies(session_id=None, business_line_code=None, status=None,
+                       query=None, batch_size=1000):
+        """Yield companies as dicts, fetched from a server-side cursor
+        
+        Rows are streamed `batch_size` at a time (yield_per / stream_results),
+        so exporting a large session never holds every row in memory. The
+        database session stays open until the generator is exhausted or closed,
+        so it is not the request's scoped session.
+        """
+        db = get_session(scoped=False)
+        try:
+            companies = db.query(Company)
+            if session_id is not None:
+                companies = companies.join(SessionCompany, SessionCompany.company_id == Company.id)\
+                                     .filter(SessionCompany.session_id == session_id)
+            if business_line_code:
+                companies = companies.filter(
+                    Company.main_business_line_code.startswith(business_line_code, autoescape=True)
+                )
+            if status:
+                companies = companies.filter(Company.status == status)
+            if query:
+                companies = companies.filter(_search_condition(db, query))
+            
+            for company in companies.order_by(Company.id).yield_per(batch_size):
+                yield company.to_dict()
         finally:
             db.close()
     
     @staticmethod
     def delete_session(session_id):
-        """Delete a session and all its companies"""
+        """Delete a session and the companies no other session contains
+        
+        Companies shared with other sessions are kept; if the deleted session
+        was the last to save them, they are attributed to their latest
+        remaining session.
+        """
         db = get_session()
         try:
             session = db.query(ScrapeSession).filter_by(id=session_id).first()
-            if session:
-                db.delete(session)
-                db.commit()
-                return True
-            return False
+            if not session:
+                return False
+            
+            db.query(SessionCompany).filter_by(session_id=session_id).delete(synchronize_session=False)
+            
+            # Companies left without any session are orphans; they only count
+            # towards their business line now
+            has_link = db.query(SessionCompany)\
+                         .filter(SessionCompany.company_id == Company.id)\
+                         .exists()
+            orphans = db.query(Company).filter(Company.session_id == session_id, ~has_link)
+            stats = StatsDelta()
+            stats.count(db.connection(), [company_id for (company_id,) in orphans.with_entities(Company.id)], -1)
+            orphans.delete(synchronize_session=False)
+            
+            latest_link = db.query(func.max(SessionCompany.session_id))\
+                            .filter(SessionCompany.company_id == Company.id)\
+                            .scalar_subquery()
+            db.query(Company)\
+              .filter(Company.session_id == session_id)\
+              .update({Company.session_id: latest_link}, synchronize_session=False)
+            
+            db.query(SessionStats).filter_by(session_id=session_id).delete(synchronize_session=False)
+            stats.apply(db.connection())
+            
+            db.delete(session)
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            raise e
         finally:
             db.close()
     
     @staticmethod
     def update_company(company_id, updates):
-        """Update a company's information"""
+        """Update a company's information (and the stats it counts towards)"""
         db = get_session()
         try:
             company = db.query(Company).filter_by(id=company_id).first()
             if company:
+                stats = StatsDelta()
+                stats.count(db.connection(), [company_id], -1)
                 for key, value in updates.items():
                     if hasattr(company, key):
                         setattr(company, key, value)
+                for key, value in derive_company_columns({
+                    'contact_info': company.contact_info,
+                    'finder_data': company.finder_data,
+                    'ai_insights': company.ai_insights
+                }).items():
+                    setattr(company, key, value)
                 company.updated_at = datetime.utcnow()
+                db.flush()
+                
+                stats.count(db.connection(), [company_id], 1)
+                stats.apply(db.connection())
                 db.commit()
                 db.refresh(company)
                 return company.to_dict()
@@ -211,18 +550,164 @@ class DatabaseService:
             db.close()
     
     @staticmethod
-    def search_companies(query, limit=50):
-        """Search companies by name or business ID"""
+    def update_companies(items, batch_size=DB_INSERT_BATCH_SIZE):
+        """Update many companies in one transaction
+        
+        items: [{'id': int, 'updates': {field: value}}]. Companies are
+        written with bulk UPDATE ... WHERE id = ? statements (executemany,
+        grouped by the set of updated fields), each batch under a savepoint; a
+        batch the database rejects is retried one company per savepoint, so a
+        bad value fails only its company. The typed columns of a changed
+        contact_info, finder_data or ai_insights are set with the same
+        statement, and the affected stats are updated with the difference
+        once. Returns one {'id', 'success'[, 'error']} result per item, in
+        order, recorded after the company's write. Invalid items (unknown
+        company or field) are reported and skipped.
+        """
+        updatable = set(Company.FIELDS) - {'id', 'created_at', 'updated_at'}
+        results = []
+        pending = {}
+        
+        for item in items:
+            company_id = item.get('id') if isinstance(item, dict) else None
+            updates = item.get('updates') if isinstance(item, dict) else None
+            if not isinstance(company_id, int) or not isinstance(updates, dict) or not updates:
+                results.append({'id': company_id, 'success': False,
+                                'error': "Each item needs an integer 'id' and non-empty 'updates'"})
+                continue
+            unknown = sorted(set(updates) - updatable)
+            if unknown:
+                results.append({'id': company_id, 'success': False,
+                                'error': f"Unknown or read-only field(s): {', '.join(unknown)}"})
+                continue
+            # A later item for the same company wins, field by field
+            pending.setdefault(company_id, {}).update(updates)
+            results.append({'id': company_id})
+        
         db = get_session()
+        errors = {}
         try:
-            companies = db.query(Company)\
-                         .filter(
-                             (Company.name.ilike(f'%{query}%')) |
-                             (Company.business_id.ilike(f'%{query}%'))
-                         )\
-                         .limit(limit)\
-                         .all()
-            return [c.to_dict() for c in companies]
+            now = datetime.utcnow()
+            ids = list(pending)
+            existing = set()
+            for start in range(0, len(ids), batch_size):
+                existing.update(db.scalars(
+                    select(Company.id).where(Company.id.in_(ids[start:start + batch_size]))
+                ))
+            
+            groups = {}
+            for company_id, updates in pending.items():
+                if company_id not in existing:
+                    errors[company_id] = 'Company not found'
+                    continue
+                row = {'id': company_id, **updates, 'updated_at': now}
+                for source, columns in DERIVED_COLUMNS.items():
+                    if source in updates:
+                        derived = derive_company_columns({source: updates[source]})
+                        row.update((column, derived[column]) for column in columns)
+                groups.setdefault(frozenset(row), []).append(row)
+            
+            # Companies that fail keep their values, so counting every company
+            # out before the writes and in after them nets out to zero for them
+            stats = StatsDelta()
+            stats.count(db.connection(), existing, -1, batch_size)
+            for rows in groups.values():
+                for start in range(0, len(rows), batch_size):
+                    batch = rows[start:start + batch_size]
+                    try:
+                        with db.begin_nested():
+                            db.execute(update(Company), batch)
+                    except SQLAlchemyError:
+                        # Retry one company at a time to find the rejected ones
+                        for row in batch:
+                            try:
+                                with db.begin_nested():
+                                    db.execute(update(Company), [row])
+                            except SQLAlchemyError as e:
+                                errors[row['id']] = str(getattr(e, 'orig', None) or e).strip()
+            stats.count(db.connection(), existing, 1, batch_size)
+            stats.apply(db.connection())
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+        
+        for result in results:
+            if 'success' not in result:
+                if result['id'] in errors:
+                    result.update(success=False, error=errors[result['id']])
+                else:
+                    result['success'] = True
+        return results
+    
+    @staticmethod
+    def get_session_stats(session_id):
+        """Precomputed company counts of a session (single-row lookup)
+        
+        A session without a stats row (no companies saved yet) has zero
+        counts; None means the session does not exist.
+        """
+        db = get_session()
+        try:
+            stats = db.get(SessionStats, session_id)
+            if stats is None:
+                if db.get(ScrapeSession, session_id) is None:
+                    return None
+                stats = SessionStats(session_id=session_id, total_companies=0, with_email=0,
+                                     verified_on_finder=0, by_city={})
+            return stats.to_dict()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_business_line_stats(business_line_code=None):
+        """Precomputed company counts of one business line, or of all of them"""
+        db = get_session()
+        try:
+            if business_line_code is not None:
+                stats = db.get(BusinessLineStats, business_line_code)
+                return stats.to_dict() if stats else None
+            stats = db.query(BusinessLineStats)\
+                      .order_by(BusinessLineStats.business_line_code)\
+                      .all()
+            return [s.to_dict() for s in stats]
+        finally:
+            db.close()
+    
+    @staticmethod
+    def search_companies(query, limit=50, fields=None):
+        """Search companies by name or business ID, best matches first
+        
+        A query that looks like a business ID is an exact-prefix lookup on
+        business_id. Otherwise names are matched by substring and Finnish
+        full-text search and ranked by the better of trigram similarity and
+        full-text rank (PostgreSQL); other databases rank names starting with
+        the query first.
+        """
+        db = get_session()
+        try:
+            query = query.strip()
+            companies = _company_query(db, fields)
+            
+            if BUSINESS_ID_PREFIX.match(query):
+                companies = companies.filter(Company.business_id.startswith(query, autoescape=True))\
+                                     .order_by(Company.business_id)
+            elif db.get_bind().dialect.name == 'postgresql':
+                relevance = func.greatest(
+                    func.similarity(Company.name, query),
+                    func.ts_rank(_name_tsvector(), _tsquery(query))
+                )
+                companies = companies.filter(_search_condition(db, query))\
+                                     .order_by(desc(relevance), Company.name)
+            else:
+                starts_with = case((Company.name.istartswith(query, autoescape=True), 0), else_=1)
+                companies = companies.filter(_search_condition(db, query))\
+                                     .order_by(starts_with, Company.name)
+            
+            companies = companies.limit(limit).all()
+            return [c.to_dict(fields) for c in companies]
         finally:
             db.close()
             
\ No newline at end of file
@@ -3,11 +3,17 @@ AI-powered contact enrichment service
 """
 from openai import OpenAI
 import json
-from utils.export_utils import export_to_csv
+from utils.export_utils import export_to_csv, NDJSONWriter, iter_ndjson
+from config import STATUS_RECENT_RESULTS
 
 
 def run_agent_enrichment(leads, openai_api_key, agent_status, scraping_status):
-    """Background task to enrich leads with ChatGPT agent"""
+    """Background task to enrich leads with ChatGPT agent
+
+    Leads with an email are appended to companies_leads_enriched.ndjson as
+    soon as they are processed.
+    """
+    writer = None
     try:
         agent_status['is_running'] = True
         agent_status['progress'] = 0
@@ -15,7 +21,7 @@ def run_agent_enrichment(leads, openai_api_key, agent_status, scraping_status):
         
         client = OpenAI(api_key=openai_api_key)
         
-        enriched_leads = []
+        writer = NDJSONWriter('companies_leads_enriched.ndjson', keep_recent=STATUS_RECENT_RESULTS)
         
         for idx, lead in enumerate(leads):
             agent_status['current_company'] = lead['name']
@@ -28,7 +34,7 @@ def run_agent_enrichment(leads, openai_api_key, agent_status, scraping_status):
             has_valid_email = len(existing_emails) > 0 or any(c.get('email') for c in existing_contacts)
             
             if has_valid_email:
-                enriched_leads.append(lead)
+                writer.write(lead)
                 continue
             
             # Use ChatGPT to find contact info and enrich with Finder.fi data
@@ -140,7 +146,7 @@ If you cannot find any contact information, return: {"emails": [], "contacts": [
                 
                 # Only add to enriched leads if we found valid contact info
                 if has_email_after:
-                    enriched_leads.append(lead)
+                    writer.write(lead)
                     print(f"✓ Added to enriched leads")
                 else:
                     print(f"✗ Skipped - no valid email found")
@@ -154,20 +160,22 @@ If you cannot find any contact information, return: {"emails": [], "contacts": [
         # Save enriched results (only leads with emails)
         print(f"\n{'='*60}")
         print(f"Total leads processed: {len(leads)}")
-        print(f"Leads with valid emails: {len(enriched_leads)}")
-        print(f"Leads removed (no email): {len(leads) - len(enriched_leads)}")
+        print(f"Leads with valid emails: {writer.count}")
+        print(f"Leads removed (no email): {len(leads) - writer.count}")
         print(f"{'='*60}\n")
         
-        with open('companies_leads_enriched.json', 'w', encoding='utf-8') as f:
-            json.dump(enriched_leads, f, ensure_ascii=False, indent=2)
+        writer.close()
         
         # Also export to CSV
-        export_to_csv(enriched_leads, 'companies_leads_enriched.csv')
+        export_to_csv(iter_ndjson('companies_leads_enriched.ndjson'), 'companies_leads_enriched.csv')
         
-        scraping_status['results'] = enriched_leads
+        writer.publish(scraping_status)
         agent_status['is_running'] = False
         
     except Exception as e:
         print(f"Error in agent: {e}")
         agent_status['is_running'] = False
-        agent_status['error'] = str(e)
\ No newline at end of file
+        agent_status['error'] = str(e)
+    finally:
+        if writer:
+            writer.close()
\ No newline at end of file
@@ -2,14 +2,19 @@
 Finder.fi validation and data extraction service with enhanced rate limiting bypass
 """
 import requests
-from bs4 import BeautifulSoup
 import time
 import re
-import json
 from urllib.parse import unquote
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import random
 from services.cache_service import load_finder_cache, save_finder_cache
-from utils.export_utils import export_to_csv
+from utils.export_utils import export_to_csv, NDJSONWriter, iter_ndjson
+from utils.rate_limiter import rate_limiter
+from utils.html_parser import parse_html
+from utils.adaptive_concurrency import AIMDConcurrencyLimiter
+from config import STATUS_RECENT_RESULTS
 
 
 # Rotating User Agents
@@ -43,25 +48,29 @@ def get_rotating_headers():
     }
 
 
-def validate_company_on_finder(company, cache=None, retry_delay=5, session=None):
+def validate_company_on_finder(company, cache=None, retry_delay=5, session=None, limiter=None):
     """Check if company exists on finder.fi and extract comprehensive details
     
     Args:
         company: Company dict with name and business_id
-        cache: Optional cache dict
+        cache: Optional cache (FinderCache or dict) keyed by business ID; data
+            fetched from Finder.fi is stored in it, cache hits are returned as
+            they are (so they keep their original fetch time and TTL)
         retry_delay: Seconds to wait between retries (default 5)
         session: Optional requests session for connection reuse
+        limiter: Optional AIMDConcurrencyLimiter that gets each response outcome recorded
     """
     try:
         company_name = company.get('name', '')
         business_id = company.get('business_id', '')
         
         # Check cache first
-        if cache and business_id in cache:
+        cached = cache.get(business_id) if cache is not None else None
+        if cached is not None:
             print(f"\n{'='*60}")
             print(f"Using cached data for: {company_name}")
             print(f"{'='*60}\n")
-            return cache[business_id]
+            return cached
         
         # Create session if not provided
         if not session:
@@ -78,15 +87,20 @@ def validate_company_on_finder(company, cache=None, retry_delay=5, session=None)
         print(f"  Search URL: {search_url}")
         print(f"  User-Agent: {headers['User-Agent'][:50]}...")
         
+        # Wait for Finder.fi request budget; it is charged once per lead; the
+        # company page and retries after 202 are paced by the backoff instead
+        rate_limiter.acquire(search_url)
+        
         # Try up to 3 times if we get 202
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                # Add random delay before request (human-like behavior)
-                time.sleep(random.uniform(0.5, 1.5))
-                
                 response = session.get(search_url, headers=headers, timeout=15)
                 
+                if limiter:
+                    limiter.record('throttled' if response.status_code == 202 else
+                                   'ok' if response.status_code == 200 else 'error')
+                
                 if response.status_code == 202:
                     wait_time = retry_delay * (attempt + 1)
                     print(f"  ⚠ Got 202 (rate limited), waiting {wait_time} seconds... (attempt {attempt + 1}/{max_retries})")
@@ -103,6 +117,8 @@ def validate_company_on_finder(company, cache=None, retry_delay=5, session=None)
                 break
                 
             except requests.exceptions.Timeout:
+                if limiter:
+                    limiter.record('timeout')
                 print(f"  ⚠ Request timeout (attempt {attempt + 1}/{max_retries})")
                 if attempt < max_retries - 1:
                     time.sleep(5)
@@ -117,7 +133,7 @@ def validate_company_on_finder(company, cache=None, retry_delay=5, session=None)
             print(f"  ✗ Search failed after {max_retries} attempts (rate limited)")
             return None
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         
         # Find all links with "yhteystiedot" in href
         results = soup.find_all('a', href=lambda x: x and 'yhteystiedot' in x if x else False)
@@ -204,17 +220,20 @@ def validate_company_on_finder(company, cache=None, retry_delay=5, session=None)
         company_url = 'https://www.finder.fi' + company_link['href']
         print(f"  Company page: {company_url}")
         
-        # Random delay + rotate headers
-        time.sleep(random.uniform(1.0, 2.0))
+        # Rotate headers
         headers = get_rotating_headers()
         
         company_response = session.get(company_url, headers=headers, timeout=10)
         
+        if limiter:
+            limiter.record('throttled' if company_response.status_code == 202 else
+                           'ok' if company_response.status_code == 200 else 'error')
+        
         if company_response.status_code != 200:
             print(f"  ✗ Failed to load company page (status {company_response.status_code})")
             return None
         
-        company_soup = BeautifulSoup(company_response.text, 'html.parser')
+        company_soup = parse_html(company_response.text)
         
         # Initialize data structure
         finder_data = {
@@ -264,6 +283,9 @@ def validate_company_on_finder(company, cache=None, retry_delay=5, session=None)
         
         print(f"{'='*60}\n")
         
+        if cache is not None and business_id:
+            cache[business_id] = finder_data
+        
         return finder_data
         
     except Exception as e:
@@ -273,18 +295,95 @@ def validate_company_on_finder(company, cache=None, retry_delay=5, session=None)
         return None
 
 
+# Every text pattern on a Finder.fi company page starts with one of these
+# keywords, so one scan for the keywords finds all candidate positions and each
+# pattern is only tried where its keyword occurs.
+FINDER_KEYWORDS = re.compile(r'👥|💰|📊|henkilöstö|liikevaihto|liikevoitto|tilikausi|perustettu', re.IGNORECASE)
+
+# keyword -> [(field, pattern, group)]
+FINDER_PATTERNS = {
+    '👥': [('employees_emoji', re.compile(r'👥\s*(\d+)'), 1)],
+    '💰': [('revenue_emoji', re.compile(r'💰\s*[Rr]evenue[:\s]*([0-9\s,.]+(?:EUR|€|miljoonaa|tuhatta)?)'), 1)],
+    '📊': [('profit_emoji', re.compile(r'📊\s*[Oo]perating [Pp]rofit[:\s]*([0-9,.-]+\s*%?)'), 1)],
+    'henkilöstö': [
+        ('employees_text', re.compile(r'Henkilöstö[:\s]+(\d+[-\s]?\d*)', re.IGNORECASE), 1),
+        ('employees_fallback', re.compile(r'Henkilöstö[:\s]+([0-9\s,.-]+)', re.IGNORECASE), 1),
+    ],
+    'liikevaihto': [
+        ('revenue_text', re.compile(r'Liikevaihto[:\s]+([0-9\s,.]+\s*(?:EUR|€|miljoonaa|tuhatta)?)', re.IGNORECASE), 1),
+    ],
+    'liikevoitto': [('profit_text', re.compile(r'Liikevoitto[:\s]+([0-9,.-]+\s*%?)', re.IGNORECASE), 1)],
+    'tilikausi': [('financial_year', re.compile(r'Tilikausi[:\s]+(\d{1,2}[./]\d{1,2}[./])?(\d{4})', re.IGNORECASE), 2)],
+    'perustettu': [('founded', re.compile(r'Perustettu[:\s]+([0-9]{4})', re.IGNORECASE), 1)],
+}
+
+FINANCIAL_CONTEXT = re.compile(r'liikevaihto|revenue|liikevoitto|profit', re.IGNORECASE)
+CONTEXT_YEAR = re.compile(r'\(?(20\d{2})\)?')
+
+EMPLOYEE_LABEL = re.compile(r'(henkilöstö|työntekijä|employees)', re.IGNORECASE)
+PEOPLE_LABEL = re.compile(r'Johto|Hallitus|Toimitusjohtaja|Management|Board', re.IGNORECASE)
+ANY_LABEL = re.compile(f'{EMPLOYEE_LABEL.pattern}|{PEOPLE_LABEL.pattern}', re.IGNORECASE)
+
+
+def _match_text_patterns(page_text):
+    """First match of every FINDER_PATTERNS field in the page text (same result as re.search per pattern)"""
+    matches = {}
+    remaining = sum(len(patterns) for patterns in FINDER_PATTERNS.values())
+    for keyword in FINDER_KEYWORDS.finditer(page_text):
+        for field, pattern, group in FINDER_PATTERNS[keyword.group().lower()]:
+            if field in matches:
+                continue
+            match = pattern.match(page_text, keyword.start())
+            if match:
+                matches[field] = match.group(group)
+                remaining -= 1
+        if not remaining:
+            break
+    return matches
+
+
+def _find_labelled_elements(soup):
+    """Elements whose own text mentions staff count or management, in one pass
+
+    Returns (employee elements: div/span/p, people sections: div/section).
+    """
+    employee_elements = []
+    people_sections = []
+    # Match the text nodes, then climb to the elements whose only content they
+    # are (what find_all(..., string=...) matches), outermost first
+    for text in soup.find_all(string=ANY_LABEL):
+        chain = []
+        elem = text.parent
+        while elem is not None and elem.string is text:
+            chain.append(elem)
+            elem = elem.parent
+        for elem in reversed(chain):
+            if elem.name in ('div', 'span', 'p') and EMPLOYEE_LABEL.search(text):
+                employee_elements.append(elem)
+            if elem.name in ('div', 'section') and PEOPLE_LABEL.search(text):
+                people_sections.append(elem)
+    return employee_elements, people_sections
+
+
 def _extract_company_data(company_soup, finder_data):
-    """Extract company data using multiple strategies"""
+    """Extract company data using multiple strategies
+    
+    The page text, the text pattern matches and the structural nodes (dl,
+    table, labelled elements) are computed once and shared by the strategies.
+    """
+    page_text = company_soup.get_text()
+    matches = _match_text_patterns(page_text)
+    employee_elements, people_sections = _find_labelled_elements(company_soup)
+    structure = company_soup.find_all(['dl', 'table'])
     
     # Extract employees with improved patterns
-    _extract_employees(company_soup, finder_data)
+    _extract_employees(matches, employee_elements, finder_data)
     
     # Extract financial data with year
-    _extract_financials(company_soup, finder_data)
+    _extract_financials(page_text, matches, finder_data)
     
     # STRATEGY 1: Definition lists
-    definition_lists = company_soup.find_all('dl')
-    for dl in definition_lists:
+    for dl in (node for node in structure if node.name == 'dl'):
         dts = dl.find_all('dt')
         dds = dl.find_all('dd')
         
@@ -294,8 +393,7 @@ def _extract_company_data(company_soup, finder_data):
             _map_field_to_data(key, value, finder_data)
     
     # STRATEGY 2: Tables
-    tables = company_soup.find_all('table')
-    for table in tables:
+    for table in (node for node in structure if node.name == 'table'):
         rows = table.find_all('tr')
         for row in rows:
             cells = row.find_all(['td', 'th'])
@@ -308,37 +406,30 @@ def _extract_company_data(company_soup, finder_data):
     _extract_with_selectors(company_soup, finder_data)
     
     # STRATEGY 4: Key people
-    _extract_key_people(company_soup, finder_data)
+    _extract_key_people(people_sections, finder_data)
     
     # STRATEGY 5: Text-based extraction
-    _extract_from_text(company_soup, finder_data)
+    _extract_from_text(matches, finder_data)
     
     return finder_data
 
 
-def _extract_employees(soup, finder_data):
+def _extract_employees(matches, employee_elements, finder_data):
     """Extract employee count with improved patterns"""
-    # Look for employee count with emoji or icons
-    page_text = soup.get_text()
-    
     # Pattern 1: 👥 33 or similar
-    emoji_pattern = r'👥\s*(\d+)'
-    match = re.search(emoji_pattern, page_text)
-    if match:
-        finder_data['basic_info']['employees'] = match.group(1)
-        print(f"    Found employees (emoji): {match.group(1)}")
+    if 'employees_emoji' in matches:
+        finder_data['basic_info']['employees'] = matches['employees_emoji']
+        print(f"    Found employees (emoji): {matches['employees_emoji']}")
         return
     
     # Pattern 2: Henkilöstö: 33
-    text_pattern = r'Henkilöstö[:\s]+(\d+[-\s]?\d*)'
-    match = re.search(text_pattern, page_text, re.IGNORECASE)
-    if match:
-        finder_data['basic_info']['employees'] = match.group(1).strip()
-        print(f"    Found employees (text): {match.group(1)}")
+    if 'employees_text' in matches:
+        finder_data['basic_info']['employees'] = matches['employees_text'].strip()
+        print(f"    Found employees (text): {matches['employees_text']}")
         return
     
     # Pattern 3: Look in specific elements
-    for elem in soup.find_all(['div', 'span', 'p'], text=re.compile(r'(henkilöstö|työntekijä|employees)', re.I)):
+    for elem in employee_elements:
         text = elem.get_text()
         numbers = re.findall(r'\d+', text)
         if numbers:
@@ -347,57 +438,49 @@ def _extract_employees(soup, finder_data):
             return
 
 
-def _extract_financials(soup, finder_data):
+def _extract_financials(page_text, matches, finder_data):
     """Extract financial data with year information"""
-    page_text = soup.get_text()
-    
     # Pattern 1: 💰 Revenue: 239 000
-    revenue_emoji_pattern = r'💰\s*[Rr]evenue[:\s]*([0-9\s,.]+(?:EUR|€|miljoonaa|tuhatta)?)'
-    match = re.search(revenue_emoji_pattern, page_text)
-    if match:
-        finder_data['financials']['revenue'] = match.group(1).strip()
-        print(f"    Found revenue (emoji): {match.group(1)}")
+    if 'revenue_emoji' in matches:
+        finder_data['financials']['revenue'] = matches['revenue_emoji'].strip()
+        print(f"    Found revenue (emoji): {matches['revenue_emoji']}")
     
     # Pattern 2: Liikevaihto: 239 000
-    if not finder_data['financials'].get('revenue'):
-        revenue_pattern = r'Liikevaihto[:\s]+([0-9\s,.]+\s*(?:EUR|€|miljoonaa|tuhatta)?)'
-        match = re.search(revenue_pattern, page_text, re.IGNORECASE)
-        if match:
-            finder_data['financials']['revenue'] = match.group(1).strip()
-            print(f"    Found revenue (text): {match.group(1)}")
+    if not finder_data['financials'].get('revenue') and 'revenue_text' in matches:
+        finder_data['financials']['revenue'] = matches['revenue_text'].strip()
+        print(f"    Found revenue (text): {matches['revenue_text']}")
     
     # Pattern 3: 📊 Operating Profit: 24,7%
-    profit_emoji_pattern = r'📊\s*[Oo]perating [Pp]rofit[:\s]*([0-9,.-]+\s*%?)'
-    match = re.search(profit_emoji_pattern, page_text)
-    if match:
-        finder_data['financials']['operating_profit'] = match.group(1).strip()
-        print(f"    Found operating profit (emoji): {match.group(1)}")
+    if 'profit_emoji' in matches:
+        finder_data['financials']['operating_profit'] = matches['profit_emoji'].strip()
+        print(f"    Found operating profit (emoji): {matches['profit_emoji']}")
     
     # Pattern 4: Liikevoitto: 24,7%
-    if not finder_data['financials'].get('operating_profit'):
-        profit_pattern = r'Liikevoitto[:\s]+([0-9,.-]+\s*%?)'
-        match = re.search(profit_pattern, page_text, re.IGNORECASE)
-        if match:
-            finder_data['financials']['operating_profit'] = match.group(1).strip()
-            print(f"    Found operating profit (text): {match.group(1)}")
+    if not finder_data['financials'].get('operating_profit') and 'profit_text' in matches:
+        finder_data['financials']['operating_profit'] = matches['profit_text'].strip()
+        print(f"    Found operating profit (text): {matches['profit_text']}")
     
     # Extract financial year
-    year_pattern = r'Tilikausi[:\s]+(\d{1,2}[./]\d{1,2}[./])?(\d{4})'
-    match = re.search(year_pattern, page_text, re.IGNORECASE)
-    if match:
-        finder_data['financials']['financial_year'] = match.group(2)
-        print(f"    Found financial year: {match.group(2)}")
+    if 'financial_year' in matches:
+        finder_data['financials']['financial_year'] = matches['financial_year']
+        print(f"    Found financial year: {matches['financial_year']}")
     
     # Alternative year pattern: (2023) or 2023
     if not finder_data['financials'].get('financial_year'):
-        # Look near revenue/profit mentions
-        for line in page_text.split('\n'):
-            if any(word in line.lower() for word in ['liikevaihto', 'revenue', 'liikevoitto', 'profit']):
-                year_match = re.search(r'\(?(20\d{2})\)?', line)
-                if year_match:
-                    finder_data['financials']['financial_year'] = year_match.group(1)
-                    print(f"    Found financial year (context): {year_match.group(1)}")
-                    break
+        # Look near revenue/profit mentions: the first such line with a year
+        line_end = -1
+        for mention in FINANCIAL_CONTEXT.finditer(page_text):
+            if mention.start() < line_end:
+                continue
+            line_start = page_text.rfind('\n', 0, mention.start()) + 1
+            line_end = page_text.find('\n', mention.end())
+            if line_end == -1:
+                line_end = len(page_text)
+            year_match = CONTEXT_YEAR.search(page_text, line_start, line_end)
+            if year_match:
+                finder_data['financials']['financial_year'] = year_match.group(1)
+                print(f"    Found financial year (context): {year_match.group(1)}")
+                break
 
 
 def _map_field_to_data(key, value, finder_data):
@@ -424,166 +507,227 @@ def _map_field_to_data(key, value, finder_data):
         finder_data['contact']['email'] = value
 
 
-def _extract_with_selectors(company_soup, finder_data):
-    """Extract using CSS selectors"""
-    # Revenue
-    revenue_selectors = [
+# CSS selectors per field, in order of preference
+FIELD_SELECTORS = {
+    ('financials', 'revenue'): [
         'div[data-field="revenue"]',
         'div.company-revenue',
         'span.revenue-value'
-    ]
-    for selector in revenue_selectors:
-        element = company_soup.select_one(selector)
-        if element and not finder_data['financials'].get('revenue'):
-            finder_data['financials']['revenue'] = element.get_text(strip=True)
-            break
-    
-    # Employees
-    employee_selectors = [
+    ],
+    ('basic_info', 'employees'): [
         'div[data-field="employees"]',
         'div.company-employees',
         'span.employee-count'
-    ]
-    for selector in employee_selectors:
-        element = company_soup.select_one(selector)
-        if element and not finder_data['basic_info'].get('employees'):
-            finder_data['basic_info']['employees'] = element.get_text(strip=True)
-            break
+    ],
+}
 
 
-def _extract_key_people(company_soup, finder_data):
-    """Extract key people/management"""
-    people_sections = company_soup.find_all(['div', 'section'], 
-        text=re.compile(r'Johto|Hallitus|Toimitusjohtaja|Management|Board', re.IGNORECASE))
+def _extract_with_selectors(company_soup, finder_data):
+    """Extract using CSS selectors
     
+    Only fields still missing are looked up, and all their selectors are
+    matched in a single walk over the document.
+    """
+    missing = [(section, field) for section, field in FIELD_SELECTORS if not finder_data[section].get(field)]
+    if not missing:
+        return
+    
+    candidates = company_soup.select(', '.join(
+        selector for key in missing for selector in FIELD_SELECTORS[key]
+    ))
+    for section, field in missing:
+        for selector in FIELD_SELECTORS[(section, field)]:
+            element = next((c for c in candidates if c.css.match(selector)), None)
+            if element:
+                finder_data[section][field] = element.get_text(strip=True)
+                break
+
+
+def _people_in(parent):
+    """People listed in person/contact/member containers under a section's parent"""
+    people = []
+    for container in parent.find_all(['div', 'li'], class_=re.compile(r'person|contact|member'))[:10]:
+        person = {}
+        
+        name_elem = container.find(['h3', 'h4', 'strong', 'span'], class_=re.compile(r'name'))
+        if name_elem:
+            person['name'] = name_elem.get_text(strip=True)
+        
+        title_elem = container.find(['span', 'p', 'div'], class_=re.compile(r'title|role|position'))
+        if title_elem:
+            person['title'] = title_elem.get_text(strip=True)
+        
+        email_elem = container.find('a', href=re.compile(r'^mailto:'))
+        if email_elem:
+            person['email'] = email_elem['href'].replace('mailto:', '')
+        
+        if person.get('name'):
+            people.append(person)
+    return people
+
+
+def _extract_key_people(people_sections, finder_data):
+    """Extract key people/management
+    
+    Sections often share a parent (a heading and its list); each parent is
+    only searched once.
+    """
+    people_by_parent = {}
     for section in people_sections:
         parent = section.find_parent()
         if parent:
-            person_containers = parent.find_all(['div', 'li'], class_=re.compile(r'person|contact|member'))
-            
-            for container in person_containers[:10]:
-                person = {}
-                
-                name_elem = container.find(['h3', 'h4', 'strong', 'span'], class_=re.compile(r'name'))
-                if name_elem:
-                    person['name'] = name_elem.get_text(strip=True)
-                
-                title_elem = container.find(['span', 'p', 'div'], class_=re.compile(r'title|role|position'))
-                if title_elem:
-                    person['title'] = title_elem.get_text(strip=True)
-                
-                email_elem = container.find('a', href=re.compile(r'^mailto:'))
-                if email_elem:
-                    person['email'] = email_elem['href'].replace('mailto:', '')
-                
-                if person.get('name'):
-                    finder_data['key_people'].append(person)
+            if id(parent) not in people_by_parent:
+                people_by_parent[id(parent)] = _people_in(parent)
+            finder_data['key_people'].extend(dict(person) for person in people_by_parent[id(parent)])
 
 
-def _extract_from_text(company_soup, finder_data):
+def _extract_from_text(matches, finder_data):
     """Extract data from page text as fallback"""
-    page_text = company_soup.get_text()
-    
     # Extract revenue if not found
-    if not finder_data['financials'].get('revenue'):
-        revenue_pattern = r'Liikevaihto[:\s]+([0-9\s,.]+\s*(?:EUR|€|miljoonaa|tuhatta)?)'
-        revenue_match = re.search(revenue_pattern, page_text, re.IGNORECASE)
-        if revenue_match:
-            finder_data['financials']['revenue'] = revenue_match.group(1).strip()
+    if not finder_data['financials'].get('revenue') and 'revenue_text' in matches:
+        finder_data['financials']['revenue'] = matches['revenue_text'].strip()
     
     # Extract employees if not found
-    if not finder_data['basic_info'].get('employees'):
-        employee_pattern = r'Henkilöstö[:\s]+([0-9\s,.-]+)'
-        employee_match = re.search(employee_pattern, page_text, re.IGNORECASE)
-        if employee_match:
-            finder_data['basic_info']['employees'] = employee_match.group(1).strip()
+    if not finder_data['basic_info'].get('employees') and 'employees_fallback' in matches:
+        finder_data['basic_info']['employees'] = matches['employees_fallback'].strip()
     
     # Extract founded year if not found
-    if not finder_data['basic_info'].get('founded'):
-        founded_pattern = r'Perustettu[:\s]+([0-9]{4})'
-        founded_match = re.search(founded_pattern, page_text, re.IGNORECASE)
-        if founded_match:
-            finder_data['basic_info']['founded'] = founded_match.group(1).strip()
+    if not finder_data['basic_info'].get('founded') and 'founded' in matches:
+        finder_data['basic_info']['founded'] = matches['founded'].strip()
+
+
+def _has_email(lead):
+    """Check if lead has an email already"""
+    return (lead.get('contact_info', {}).get('emails') or 
+            any(c.get('email') for c in lead.get('contact_info', {}).get('contacts', [])))
 
 
 def run_finder_validation(leads, validation_status, scraping_status, config=None):
     """Background task to validate leads on finder.fi with caching
     
+    Leads are validated by a pool of workers whose concurrency adapts to
+    Finder.fi responses (AIMD): it grows while searches return 200 and is cut
+    when 202 responses or timeouts become frequent. New leads are started at
+    most at the Finder.fi rate limiter budget (one search per lead), and only
+    a bounded window of leads is queued ahead of the workers so a failure
+    stops the run without working through the rest of the list.
+    
     Args:
         leads: List of company leads to validate
         validation_status: Status dict for tracking progress
-        scraping_status: Status dict for storing results
-        config: Optional dict with settings like {'retry_delay': 5, 'between_delay': 4}
+        scraping_status: Status dict showing the validated results file
+        config: Optional dict with settings like {'retry_delay': 5, 'between_delay': 4,
+            'concurrency': 2, 'max_concurrency': 8}
+            where between_delay is the minimum number of seconds between starting two leads
+            (for this run only; the configured budget is restored afterwards)
     """
+    finder_budget = rate_limiter.budget('finder.fi')
     try:
         # Get configuration or use defaults
-        retry_delay = config.get('retry_delay', 5) if config else 5
-        between_delay = config.get('between_delay', 4) if config else 4
+        config = config or {}
+        retry_delay = config.get('retry_delay', 5)
+        between_delay = config.get('between_delay')
+        if between_delay:
+            rate_limiter.configure('finder.fi', 1 / between_delay, finder_budget[1])
+        max_concurrency = max(1, int(config.get('max_concurrency', 8)))
+        limiter = AIMDConcurrencyLimiter(
+            initial=int(config.get('concurrency', 2)),
+            maximum=max_concurrency
+        )
         
         validation_status['is_running'] = True
         validation_status['progress'] = 0
         validation_status['total'] = len(leads)
         validation_status['validated_count'] = 0
         validation_status['removed_count'] = 0
+        validation_status.update(limiter.stats())
         
-        # Load cache
+        # Load cache (warmed by previous, possibly interrupted, runs)
         cache = load_finder_cache()
         print(f"Loaded cache with {len(cache)} entries")
-        print(f"Using retry delay: {retry_delay}s, between request delay: {between_delay}s")
+        finder_rate = rate_limiter.budget('finder.fi')[0]
+        print(f"Using retry delay: {retry_delay}s, Finder.fi budget: {finder_rate:.2f} leads/s, "
+              f"concurrency: {limiter.current_limit} (max {max_concurrency})")
         
-        validated_leads = []
-        cache_updated = False
+        status_lock = threading.Lock()
+        thread_local = threading.local()
+        sessions = []
         
-        # Create persistent session for connection reuse
-        session = requests.Session()
-        
-        for idx, lead in enumerate(leads):
-            validation_status['current_company'] = lead['name']
-            validation_status['progress'] = idx + 1
-            
-            print(f"\n[{idx + 1}/{len(leads)}] Validating: {lead['name']}")
-            
-            # Check if lead has email already
-            has_email = (lead.get('contact_info', {}).get('emails') or 
-                        any(c.get('email') for c in lead.get('contact_info', {}).get('contacts', [])))
-            
-            # Check on finder.fi (with cache and session reuse)
-            finder_data = validate_company_on_finder(lead, cache, retry_delay, session)
+        def validate(lead):
+            limiter.acquire()
+            try:
+                # Create persistent session per worker for connection reuse
+                if not hasattr(thread_local, 'session'):
+                    thread_local.session = requests.Session()
+                    with status_lock:
+                        sessions.append(thread_local.session)
+                
+                validation_status['current_company'] = lead['name']
+                print(f"\nValidating: {lead['name']}")
+                
+                # Check on finder.fi (with cache and session reuse); fetched
+                # data is added to the cache, hits are left untouched
+                finder_data = validate_company_on_finder(lead, cache, retry_delay, thread_local.session, limiter)
+            finally:
+                limiter.release()
             
-            # Update cache if we got new data
-            if finder_data and lead.get('business_id'):
-                cache[lead['business_id']] = finder_data
-                cache_updated = True
+            has_email = _has_email(lead)
             
-            # Keep lead if: has email OR found on finder (or both)
-            if has_email or finder_data:
-                if finder_data:
-                    lead['finder_data'] = finder_data
-                validated_leads.append(lead)
-                validation_status['validated_count'] += 1
-                
-                if has_email and finder_data:
-                    print(f"  ✓ Kept (has email + found on finder)")
-                elif has_email:
-                    print(f"  ✓ Kept (has email)")
+            with status_lock:
+                # Keep lead if: has email OR found on finder (or both)
+                if has_email or finder_data:
+                    if finder_data:
+                        lead['finder_data'] = finder_data
+                    validation_status['validated_count'] += 1
+                    
+                    if has_email and finder_data:
+                        print(f"  ✓ Kept (has email + found on finder): {lead['name']}")
+                    elif has_email:
+                        print(f"  ✓ Kept (has email): {lead['name']}")
+                    else:
+                        print(f"  ✓ Kept (found on finder): {lead['name']}")
                 else:
-                    print(f"  ✓ Kept (found on finder)")
-            else:
-                # Remove only if NO email AND NOT found on finder
-                validation_status['removed_count'] += 1
-                print(f"  ✗ Removed (no email + not found on finder)")
+                    # Remove only if NO email AND NOT found on finder
+                    validation_status['removed_count'] += 1
+                    print(f"  ✗ Removed (no email + not found on finder): {lead['name']}")
+                
+                validation_status['progress'] += 1
+                validation_status.update(limiter.stats())
             
-            # Configurable delay with randomization (more human-like)
-            delay = random.uniform(between_delay, between_delay + 2)
-            time.sleep(delay)
-        
-        # Close session
-        session.close()
-        
-        # Save updated cache
-        if cache_updated:
+            return bool(has_email or finder_data)
+        
+        # New cache entries are checkpointed as the run goes; the final
+        # checkpoint also runs if validation fails part-way. Kept leads are
+        # streamed to NDJSON in the original lead order as they finish; at
+        # most two leads per worker are queued, and queued leads are
+        # cancelled when one fails.
+        window = 2 * max_concurrency
+        pending = deque()
+        
+        def collect_oldest():
+            lead, future = pending.popleft()
+            if future.result():
+                writer.write(lead)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor, \
+                    NDJSONWriter('companies_leads_validated.ndjson', keep_recent=STATUS_RECENT_RESULTS) as writer:
+                try:
+                    for lead in leads:
+                        if len(pending) >= window:
+                            collect_oldest()
+                        pending.append((lead, executor.submit(validate, lead)))
+                    while pending:
+                        collect_oldest()
+                except BaseException:
+                    for _, future in pending:
+                        future.cancel()
+                    raise
+        finally:
+            for session in sessions:
+                session.close()
             save_finder_cache(cache)
-            print(f"\n✓ Cache updated with {len(cache)} total entries")
+            print(f"\n✓ Cache saved with {len(cache)} total entries")
         
         # Save validated results
         print(f"\n{'='*60}")
@@ -593,14 +737,10 @@ def run_finder_validation(leads, validation_status, scraping_status, config=None
         print(f"  Removed: {validation_status['removed_count']}")
         print(f"{'='*60}\n")
         
-        # Save as JSON
-        with open('companies_leads_validated.json', 'w', encoding='utf-8') as f:
-            json.dump(validated_leads, f, ensure_ascii=False, indent=2)
-        
         # Also export to CSV
-        export_to_csv(validated_leads, 'companies_leads_validated.csv')
+        export_to_csv(iter_ndjson('companies_leads_validated.ndjson'), 'companies_leads_validated.csv')
         
-        scraping_status['results'] = validated_leads
+        writer.publish(scraping_status)
         validation_status['is_running'] = False
         
     except Exception as e:
@@ -609,4 +749,6 @@ def run_finder_validation(leads, validation_status, scraping_status, config=None
         traceback.print_exc()
         validation_status['is_running'] = False
         validation_status['error'] = str(e)
-        
\ No newline at end of file
+    finally:
+        if rate_limiter.budget('finder.fi') != finder_budget:
+            rate_limiter.configure('finder.fi', *finder_budget)
@@ -2,85 +2,382 @@
 Scraping orchestration service
 """
 from ytj_scraper import YTJCompanyScraper
-from utils.export_utils import export_to_csv
-import json
+from async_ytj_scraper import AsyncYTJCompanyScraper
+from services.db_service import DatabaseService
+from config import STATUS_RECENT_RESULTS
+from utils.export_utils import export_to_csv, NDJSONWriter, iter_ndjson, ndjson_path
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import deque
+import asyncio
+import threading
 
 
-def run_scraper(params, scraping_status):
-    """Background task to run the scraper"""
-    try:
-        scraping_status['is_running'] = True
-        scraping_status['progress'] = 0
-        scraping_status['results'] = []
-        
-        scraper = YTJCompanyScraper()
-        
-        # Custom scrape with progress tracking
-        all_results = []
-        page = 1
-        companies_processed = 0
-        max_companies = params['max_companies']
-        main_business_line_filter = params.get('main_business_line')
-        
-        scraping_status['total'] = max_companies
-        
-        while companies_processed < max_companies:
-            data = scraper.get_companies(
+class ScrapeJobTracker:
+    """Persists the resumable cursor of a scrape job to its ScrapeSession
+
+    The cursor holds the YTJ page and the offset within that page of the first
+    company not yet written to the results file, and the number of companies
+    written so far. Companies are recorded strictly in order and only once
+    written, so companies still in flight when a job dies are redone on resume
+    and the cursor stays the same size however long the job runs. Writes are
+    throttled to one every `save_every` written companies. Without a database
+    the tracker keeps state in memory only.
+    """
+
+    def __init__(self, session_id=None, cursor=None, save_every=25):
+        cursor = cursor or {}
+        self.session_id = session_id
+        self.page = cursor.get('page', 1)
+        self.offset = cursor.get('offset', 0)
+        # Where this run starts; page/offset move forward as companies are written
+        self.start_page = self.page
+        self.start_offset = self.offset
+        # Cursors saved by earlier versions list every processed business ID;
+        # they are still skipped (and kept as they are, the set never grows)
+        self.processed_ids = set(cursor.get('processed_ids', []))
+        self.processed = cursor.get('processed', len(self.processed_ids))
+        self.save_every = save_every
+        self.unsaved = 0
+        self.lock = threading.Lock()
+        # Serializes saves so an older cursor never overwrites a newer one
+        self.save_lock = threading.Lock()
+
+    @classmethod
+    def start(cls, params):
+        """Create a 'running' ScrapeSession for a new job"""
+        try:
+            session = DatabaseService.create_session(
+                business_line=params.get('main_business_line'),
+                location=params.get('location'),
+                company_form=params.get('company_form'),
+                params=params
+            )
+            return cls(session.id)
+        except Exception as e:
+            print(f"⚠ Scrape job will not be resumable (database unavailable): {e}")
+            return cls()
+
+    def company_done(self, position):
+        """Record the next company written in order, at `position` = (page, index)
+
+        Returns True when the cursor is due to be saved.
+        """
+        with self.lock:
+            self.page, self.offset = position[0], position[1] + 1
+            self.processed += 1
+            self.unsaved += 1
+            return self.unsaved >= self.save_every
+
+    def cursor(self):
+        with self.lock:
+            cursor = {'page': self.page, 'offset': self.offset, 'processed': self.processed}
+            if self.processed_ids:
+                cursor['processed_ids'] = sorted(self.processed_ids)
+            return cursor
+
+    def save(self, status=None):
+        if self.session_id is None:
+            return
+        with self.save_lock:
+            cursor = self.cursor()
+            with self.lock:
+                self.unsaved = 0
+            try:
+                DatabaseService.update_session_cursor(self.session_id, cursor, status=status)
+            except Exception as e:
+                print(f"⚠ Could not save scrape cursor: {e}")
+
+
+def _enrich_company(scraper, result):
+    """Find website and scrape contact info for a single processed company"""
+    # If no valid website in API, search for it
+    if not result['website']:
+        result['website'] = scraper.duckduckgo_search(result['name'])
+
+    # Scrape contact info from website
+    if result['website']:
+        result['contact_info'] = scraper.extract_contact_info(result['website'], result['name'])
+
+    return result
+
+
+def _matches_business_line(result, main_business_line_filter):
+    """Check the company's business line against the requested filter"""
+    if not main_business_line_filter:
+        return True
+
+    company_bl_code = result.get('main_business_line_code', '')
+    # Check if it matches exactly or starts with the code (for subcategories)
+    if company_bl_code == main_business_line_filter or company_bl_code.startswith(main_business_line_filter):
+        return True
+
+    print(f"  Skipping {result['name']} - business line {company_bl_code} doesn't match filter {main_business_line_filter}")
+    return False
+
+
+def _select_companies(scraper, companies, page, params, tracker):
+    """Yield ((page, index), result) for the companies of one YTJ page that still need scraping"""
+    main_business_line_filter = params.get('main_business_line')
+
+    for index, company in enumerate(companies):
+        # Skip what a previous run of this job already finished
+        if page == tracker.start_page and index < tracker.start_offset:
+            continue
+        if company.get('businessId', {}).get('value') in tracker.processed_ids:
+            continue
+
+        result = scraper.process_company(company)
+        if not _matches_business_line(result, main_business_line_filter):
+            continue
+
+        yield (page, index), result
+
+
+def _iter_matching_companies(scraper, params, max_companies, tracker):
+    """Yield ((page, index), result) page by page, in YTJ order, until max_companies is reached"""
+    page = tracker.start_page
+    yielded = 0
+
+    while yielded < max_companies:
+        data = scraper.get_companies(
+            params.get('main_business_line'),
+            params.get('location'),
+            params.get('company_form'),
+            page
+        )
+
+        if not data or not data.get('companies'):
+            break
+
+        for position, result in _select_companies(scraper, data['companies'], page, params, tracker):
+            if yielded >= max_companies:
+                break
+            yielded += 1
+            yield position, result
+
+        page += 1
+
+
+def _scrape_sequential(scraper, params, max_companies, scraping_status, tracker, writer):
+    """Process companies one at a time"""
+    for position, result in _iter_matching_companies(scraper, params, max_companies, tracker):
+        scraping_status['current_company'] = result['name']
+
+        _enrich_company(scraper, result)
+
+        writer.write(result)
+        if tracker.company_done(position):
+            tracker.save()
+        scraping_status['progress'] = writer.count
+        writer.publish(scraping_status)
+
+
+def _scrape_concurrent(scraper, params, max_companies, scraping_status, workers, tracker, writer):
+    """Fetch YTJ pages in order and enrich companies on a bounded worker pool
+
+    Website discovery and contact scraping run on `workers` threads, each with
+    its own scraper (and HTTP session). Results are collected in the original
+    YTJ order; the results file always holds the in-order prefix of finished
+    companies while `progress` counts every finished company.
+    """
+    thread_local = threading.local()
+    status_lock = threading.Lock()
+    # Bound the number of companies submitted but not yet collected, so page
+    # fetching stays just ahead of the in-order collection (a slot is only
+    # freed once its result has been written)
+    window = workers * 2
+
+    pending = deque()
+    completed = 0
+
+    def worker(result):
+        nonlocal completed
+        try:
+            if not hasattr(thread_local, 'scraper'):
+                thread_local.scraper = YTJCompanyScraper()
+
+            with status_lock:
+                scraping_status['current_company'] = result['name']
+
+            try:
+                return _enrich_company(thread_local.scraper, result)
+            except Exception as e:
+                print(f"  Error enriching {result['name']}: {e}")
+                return result
+        finally:
+            with status_lock:
+                completed += 1
+                scraping_status['progress'] = completed
+
+    def collect_finished(wait=False):
+        # Move finished futures from the head of the queue into the ordered results
+        while pending and (wait or pending[0][1].done()):
+            position, future = pending.popleft()
+            writer.write(future.result())
+            # Only a written company counts as processed for resuming
+            if tracker.company_done(position):
+                tracker.save()
+        writer.publish(scraping_status)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for position, result in _iter_matching_companies(scraper, params, max_companies, tracker):
+            # Window full: wait for the head of the queue, however fast the others are
+            while len(pending) >= window:
+                wait([pending[0][1]])
+                collect_finished()
+            pending.append((position, executor.submit(worker, result)))
+            collect_finished()
+
+        collect_finished(wait=True)
+
+
+async def _scrape_async(params, max_companies, scraping_status, workers, tracker, writer):
+    """Run the whole pipeline on one event loop with AsyncYTJCompanyScraper
+
+    YTJ pages are fetched in order; up to `workers` companies are enriched
+    concurrently (each of which may have several fetches in flight, capped per
+    host by the scraper's connector). Results keep the original YTJ order, and
+    at most `workers * 2` companies are started but not yet collected.
+    """
+    slots = asyncio.Semaphore(workers)
+    window = workers * 2
+    pending = deque()
+    started = 0
+    completed = 0
+    # Cursor saves run in the default executor, off the event loop
+    saves = []
+    loop = asyncio.get_running_loop()
+
+    async with AsyncYTJCompanyScraper(max_connections=max(workers * 2, 20)) as scraper:
+
+        async def enrich(result):
+            nonlocal completed
+            try:
+                scraping_status['current_company'] = result['name']
+                if not result['website']:
+                    result['website'] = await scraper.duckduckgo_search(result['name'])
+                if result['website']:
+                    result['contact_info'] = await scraper.extract_contact_info(result['website'], result['name'])
+            except Exception as e:
+                print(f"  Error enriching {result['name']}: {e}")
+            finally:
+                completed += 1
+                scraping_status['progress'] = completed
+                slots.release()
+            return result
+
+        def collect_finished():
+            # Publish the in-order prefix of finished companies
+            while pending and pending[0][1].done():
+                position, task = pending.popleft()
+                writer.write(task.result())
+                # Only a written company counts as processed for resuming
+                if tracker.company_done(position):
+                    saves.append(loop.run_in_executor(None, tracker.save))
+            writer.publish(scraping_status)
+
+        page = tracker.start_page
+        while started < max_companies:
+            data = await scraper.get_companies(
                 params.get('main_business_line'),
                 params.get('location'),
                 params.get('company_form'),
                 page
             )
-            
+
             if not data or not data.get('companies'):
                 break
-            
-            companies = data['companies']
-            
-            for company in companies:
-                if companies_processed >= max_companies:
+
+            for position, result in _select_companies(scraper, data['companies'], page, params, tracker):
+                if started >= max_companies:
                     break
-                
-                result = scraper.process_company(company)
-                
-                # Filter by business line code if specified
-                if main_business_line_filter:
-                    company_bl_code = result.get('main_business_line_code', '')
-                    # Check if it matches exactly or starts with the code (for subcategories)
-                    if not (company_bl_code == main_business_line_filter or company_bl_code.startswith(main_business_line_filter)):
-                        print(f"  Skipping {result['name']} - business line {company_bl_code} doesn't match filter {main_business_line_filter}")
-                        continue
-                
-                scraping_status['current_company'] = result['name']
-                
-                # If no valid website in API, search for it
-                if not result['website']:
-                    result['website'] = scraper.duckduckgo_search(result['name'])
-                
-                # Scrape contact info from website
-                if result['website']:
-                    result['contact_info'] = scraper.extract_contact_info(result['website'], result['name'])
-                
-                all_results.append(result)
-                companies_processed += 1
-                scraping_status['progress'] = companies_processed
-                scraping_status['results'] = all_results
-            
+
+                # Window full: wait for the head of the queue
+                while len(pending) >= window:
+                    await asyncio.wait([pending[0][1]])
+                    collect_finished()
+
+                await slots.acquire()
+                pending.append((position, asyncio.create_task(enrich(result))))
+                started += 1
+                collect_finished()
+
             page += 1
-        
-        # Save to JSON
+
+        await asyncio.gather(*(task for _, task in pending))
+        collect_finished()
+        await asyncio.gather(*saves)
+
+
+def run_scraper(params, scraping_status, resume_session_id=None):
+    """Background task to run the scraper
+
+    Every job is recorded as a ScrapeSession whose cursor (page, offset within
+    the page, number of companies written) is saved as the job goes, so an
+    interrupted job can be continued with resume_session_id.
+
+    Finished companies are appended, in order, to an NDJSON file next to
+    output_file (companies_leads.json -> companies_leads.ndjson) as soon as they
+    are ready; a resumed job appends to the same file. The status only shows
+    the number of companies written and the latest few (see /api/results).
+
+    Params:
+        max_companies: number of companies to collect
+        engine: 'threads' (default) or 'async' to use AsyncYTJCompanyScraper
+        workers: number of companies enriched in parallel
+            (threads default 1 = sequential, async default 100)
+    """
+    tracker = None
+    try:
+        scraping_status['is_running'] = True
+        scraping_status['progress'] = 0
+        scraping_status['results'] = []
+        scraping_status['results_count'] = 0
+        scraping_status.pop('error', None)
+
+        if resume_session_id is not None:
+            state = DatabaseService.get_scrape_state(resume_session_id)
+            params = state['params']
+            tracker = ScrapeJobTracker(resume_session_id, state['cursor'])
+            tracker.save(status='running')
+            print(f"Resuming scrape session {resume_session_id} from page {tracker.page}, "
+                  f"offset {tracker.offset} ({tracker.processed} companies already done)")
+        else:
+            tracker = ScrapeJobTracker.start(params)
+        scraping_status['session_id'] = tracker.session_id
+
+        # Companies finished by an earlier run of this job count towards max_companies
+        max_companies = params['max_companies'] - tracker.processed
+        engine = params.get('engine', 'threads')
+        default_workers = 100 if engine == 'async' else 1
+        workers = max(1, int(params.get('workers', default_workers) or default_workers))
+
+        scraping_status['total'] = max(max_companies, 0)
+
         output_file = params.get('output_file', 'companies_leads.json')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_results, f, ensure_ascii=False, indent=2)
-        
+        results_file = ndjson_path(output_file)
+
+        with NDJSONWriter(results_file, append=resume_session_id is not None,
+                          keep_recent=STATUS_RECENT_RESULTS) as writer:
+            writer.publish(scraping_status)
+            if max_companies > 0:
+                if engine == 'async':
+                    asyncio.run(_scrape_async(params, max_companies, scraping_status, workers, tracker, writer))
+                elif workers > 1:
+                    _scrape_concurrent(YTJCompanyScraper(), params, max_companies, scraping_status, workers, tracker, writer)
+                else:
+                    _scrape_sequential(YTJCompanyScraper(), params, max_companies, scraping_status, tracker, writer)
+
         # Also export to CSV
         csv_file = output_file.replace('.json', '.csv')
-        export_to_csv(all_results, csv_file)
-        
+        export_to_csv(iter_ndjson(results_file), csv_file)
+
+        tracker.save(status='completed')
         scraping_status['is_running'] = False
-        
+
     except Exception as e:
         print(f"Error in scraper: {e}")
+        if tracker:
+            tracker.save(status='failed')
         scraping_status['is_running'] = False
         scraping_status['error'] = str(e)
-        
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Tests for contact page discovery on company websites
+"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from async_ytj_scraper import AsyncYTJCompanyScraper
+from ytj_scraper import FetchedPage, YTJCompanyScraper
+
+PAGES = {
+    '/fi/': '<a href="yhteystiedot.html">Yhteystiedot</a>',
+    '/fi/yhteystiedot.html': '<p>myynti@kuopionkoodi.fi</p>',
+}
+
+
+class RedirectingSite(BaseHTTPRequestHandler):
+    """Redirects / to /fi/, whose contact link is relative"""
+
+    def do_GET(self):
+        if self.path == '/':
+            self.send_response(302)
+            self.send_header('Location', '/fi/')
+            self.end_headers()
+            return
+        body = PAGES.get(self.path)
+        self.send_response(200 if body else 404)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        self.wfile.write((body or '').encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site_url():
+    server = HTTPServer(('127.0.0.1', 0), RedirectingSite)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_contact_links_resolve_against_final_url(site_url):
+    scraper = YTJCompanyScraper()
+
+    assert scraper.try_fetch_url(site_url) == FetchedPage(site_url + 'fi/', PAGES['/fi/'])
+    assert scraper.extract_contact_info(site_url)['emails'] == ['myynti@kuopionkoodi.fi']
+
+
+def test_async_contact_links_resolve_against_final_url(site_url):
+    async def scrape():
+        async with AsyncYTJCompanyScraper() as scraper:
+            return await scraper.try_fetch_url(site_url), await scraper.extract_contact_info(site_url)
+
+    page, contact_info = asyncio.run(scrape())
+
+    assert page == FetchedPage(site_url + 'fi/', PAGES['/fi/'])
+    assert contact_info['emails'] == ['myynti@kuopionkoodi.fi']
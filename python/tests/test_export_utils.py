@@ -0,0 +1,28 @@
+"""
+Tests for the streaming lead exports
+"""
+import io
+
+import pytest
+
+from utils.export_utils import iter_parquet
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def read_parquet(chunks):
+    return pq.read_table(io.BytesIO(b''.join(chunks))).to_pylist()
+
+
+def test_parquet_missing_values_are_null():
+    leads = [
+        {'name': 'Kuopion Koodi Oy', 'business_id': '1234567-8', 'website': None, 'address': None},
+        {'name': 'Pohjolan Rakennus Oy', 'business_id': '3012345-7', 'website': 'www.pohjolanrakennus.fi'},
+    ]
+    rows = read_parquet(iter_parquet(leads, batch_size=1))
+
+    assert [row['Company Name'] for row in rows] == ['Kuopion Koodi Oy', 'Pohjolan Rakennus Oy']
+    assert rows[0]['Website'] is None
+    assert rows[0]['Street'] in (None, '')
+    assert rows[1]['Website'] == 'www.pohjolanrakennus.fi'
+    assert 'None' not in [value for row in rows for value in row.values()]
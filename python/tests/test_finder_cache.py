@@ -0,0 +1,61 @@
+"""
+Tests for the Finder.fi cache TTL
+"""
+import pytest
+
+from services import cache_service, finder_service
+from services.cache_service import FinderCache
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_service.time, 'time', clock.time)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = FinderCache(path=str(tmp_path / 'finder_cache.db'), legacy_path=None, ttl_seconds=2)
+    yield cache
+    cache.close()
+
+
+def test_entry_hit_repeatedly_still_expires_after_ttl(cache, clock, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(finder_service, 'load_finder_cache', lambda: cache)
+    company = {'name': 'Kuopion Koodi Oy', 'business_id': '1234567-8'}
+    cache.put(company['business_id'], {'verified_on_finder': True})
+
+    for _ in range(2):
+        clock.now += 1
+        validation_status, scraping_status = {}, {}
+        # Every lookup is a cache hit, so nothing is fetched from Finder.fi
+        finder_service.run_finder_validation([dict(company)], validation_status, scraping_status)
+        assert validation_status['validated_count'] == 1
+        assert scraping_status['results'][0]['finder_data'] == {'verified_on_finder': True}
+
+    clock.now += 1
+    assert company['business_id'] not in cache
+    assert cache.get(company['business_id']) is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_hit_updates_access_time_only(cache, clock):
+    cache.put('1234567-8', {'verified_on_finder': True})
+    clock.now += 1.5
+    cache.get('1234567-8')
+
+    fetched_at, accessed_at = cache.conn.execute(
+        'SELECT fetched_at, accessed_at FROM finder_cache WHERE business_id = ?', ('1234567-8',)
+    ).fetchone()
+    assert fetched_at == clock.now - 1.5
+    assert accessed_at == clock.now
@@ -0,0 +1,54 @@
+"""
+Regression tests for the single-pass Finder.fi company page extractor
+
+Each page in fixtures/finder/ has the expected finder_data next to it
+(same name, .json).
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from services.finder_service import FINDER_PATTERNS, _extract_company_data, _match_text_patterns
+from utils.html_parser import PARSERS, parse_html, resolve_parser
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures' / 'finder'
+PAGES = sorted(FIXTURES_DIR.glob('*.html'))
+BACKENDS = [backend for backend in PARSERS if resolve_parser(backend) == backend]
+
+
+def empty_finder_data():
+    return {'basic_info': {}, 'financials': {}, 'contact': {}, 'key_people': []}
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('page', PAGES, ids=lambda page: page.stem)
+def test_extract_company_data(page, backend):
+    expected = json.loads(page.with_suffix('.json').read_text(encoding='utf-8'))
+    soup = parse_html(page.read_text(encoding='utf-8'), backend)
+
+    assert _extract_company_data(soup, empty_finder_data()) == expected
+
+
+@pytest.mark.parametrize('page', PAGES, ids=lambda page: page.stem)
+def test_match_text_patterns_finds_first_match_of_every_pattern(page):
+    page_text = parse_html(page.read_text(encoding='utf-8')).get_text()
+    matches = _match_text_patterns(page_text)
+
+    for patterns in FINDER_PATTERNS.values():
+        for field, pattern, group in patterns:
+            match = pattern.search(page_text)
+            assert matches.get(field) == (match.group(group) if match else None), field
+
+
+def test_key_people_are_copied_per_section():
+    # Two labelled sections under one parent list the same people twice;
+    # the entries must not be shared objects
+    soup = parse_html(
+        '<div><div>Johto</div><div>Hallitus</div>'
+        '<div class="person"><span class="name">Matti Virtanen</span></div></div>'
+    )
+    finder_data = _extract_company_data(soup, empty_finder_data())
+
+    assert finder_data['key_people'] == [{'name': 'Matti Virtanen'}, {'name': 'Matti Virtanen'}]
+    assert finder_data['key_people'][0] is not finder_data['key_people'][1]
@@ -1,10 +1,45 @@
 """
 Utility functions package
 """
-from .export_utils import export_to_csv
+from .export_utils import (
+    export_to_csv, iter_csv, iter_parquet, NDJSONWriter, iter_ndjson, iter_ndjson_lines, iter_leads,
+    iter_json_array, ndjson_path
+)
 from .headers_utils import get_browser_headers
+from .rate_limiter import TokenBucket, HostRateLimiter, rate_limiter
+from .adaptive_concurrency import AIMDConcurrencyLimiter
+from .lead_metrics import derive_company_columns, parse_revenue
+from .html_parser import parse_html
+from .http_fetch import BodyReader, NotHTML, is_html
+from .matchers import is_directory_url, is_sales_email, unwrap_redirect
+from .contact_extractor import PageText, extract_contacts, extract_emails, extract_phones
 
 __all__ = [
     'export_to_csv',
+    'iter_csv',
+    'iter_parquet',
+    'NDJSONWriter',
+    'iter_ndjson',
+    'iter_ndjson_lines',
+    'iter_leads',
+    'iter_json_array',
+    'ndjson_path',
     'get_browser_headers',
+    'TokenBucket',
+    'HostRateLimiter',
+    'rate_limiter',
+    'AIMDConcurrencyLimiter',
+    'derive_company_columns',
+    'parse_revenue',
+    'parse_html',
+    'BodyReader',
+    'NotHTML',
+    'is_html',
+    'is_directory_url',
+    'is_sales_email',
+    'unwrap_redirect',
+    'PageText',
+    'extract_contacts',
+    'extract_emails',
+    'extract_phones',
 ]
@@ -0,0 +1,85 @@
+"""
+Adaptive (AIMD) concurrency limiting for rate-limited remote services
+"""
+import threading
+import time
+from collections import deque
+
+
+class AIMDConcurrencyLimiter:
+    """Concurrency limit that grows additively on success and shrinks multiplicatively on throttling
+
+    Workers call acquire() before a unit of work and release() afterwards, and
+    report each remote response with record(). Every successful response adds
+    `increase / limit` (about +increase per round of in-flight requests). When
+    throttled responses (HTTP 202, timeouts) exceed `throttle_threshold` of the
+    recent window the limit is multiplied by `decrease`, at most once per round
+    of in-flight requests.
+    """
+
+    THROTTLED = ('throttled', 'timeout')
+
+    def __init__(self, initial=2, minimum=1, maximum=8, increase=1.0, decrease=0.5,
+                 window=20, throttle_threshold=0.1):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.throttle_threshold = throttle_threshold
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.outcomes = deque(maxlen=window)
+        self.outcomes_since_decrease = 0
+        self.condition = threading.Condition()
+
+    @property
+    def current_limit(self):
+        return int(self.limit)
+
+    def acquire(self):
+        """Block until the number of in-flight units is below the current limit"""
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def record(self, outcome):
+        """Record a remote response: 'ok', 'throttled', 'timeout' or 'error'"""
+        with self.condition:
+            throttled = outcome in self.THROTTLED
+            self.outcomes.append((time.monotonic(), throttled))
+            self.outcomes_since_decrease += 1
+
+            if throttled:
+                if (self._throttle_rate() > self.throttle_threshold and
+                        self.outcomes_since_decrease >= int(self.limit)):
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.outcomes_since_decrease = 0
+            elif outcome == 'ok':
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+            self.condition.notify_all()
+
+    def _throttle_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for _, throttled in self.outcomes if throttled) / len(self.outcomes)
+
+    def stats(self):
+        """Current limit, throttled share and responses per second over the recent window"""
+        with self.condition:
+            observed_rate = 0.0
+            if len(self.outcomes) > 1:
+                elapsed = time.monotonic() - self.outcomes[0][0]
+                if elapsed > 0:
+                    observed_rate = len(self.outcomes) / elapsed
+            return {
+                'concurrency': int(self.limit),
+                'throttle_rate': round(self._throttle_rate(), 3),
+                'observed_rate': round(observed_rate, 3)
+            }
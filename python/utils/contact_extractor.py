@@ -0,0 +1,185 @@
+"""
+Single-pass contact extraction from parsed HTML pages
+"""
+import re
+from bisect import bisect_right
+
+from bs4 import CData, NavigableString, Tag
+
+from .matchers import EMAIL, NAME, OBFUSCATED_EMAIL, PHONE
+
+
+# In order of preference when a block mentions several
+TITLE_KEYWORDS = ['CEO', 'CTO', 'COO', 'Director', 'Manager', 'Head',
+                  'Toimitusjohtaja', 'Johtaja', 'Päällikkö', 'Sales', 'Myynti']
+# Acronyms must stand alone ('cto' is inside 'director'); Finnish titles are
+# usually compounds ('myyntipäällikkö'), so those match anywhere in a word
+TITLE = re.compile(r'\b(?:CEO|CTO|COO)\b|Director|Manager|Head|Toimitusjohtaja|Johtaja|Päällikkö|Sales|Myynti',
+                   re.IGNORECASE)
+TITLE_RANK = {keyword.lower(): rank for rank, keyword in enumerate(TITLE_KEYWORDS)}
+
+BLOCK_TAGS = frozenset(['div', 'section', 'article', 'li'])
+# Text inside these runs on with its neighbours; every other element boundary is a word break
+INLINE_TAGS = frozenset(['a', 'abbr', 'b', 'bdi', 'bdo', 'cite', 'code', 'em', 'font', 'i', 'kbd', 'mark',
+                         'q', 's', 'small', 'span', 'strong', 'sub', 'sup', 'time', 'u', 'var', 'wbr'])
+# get_text() skips script/style contents (typed strings); comments and doctypes too
+TEXT_TYPES = (NavigableString, CData)
+
+
+class PageText:
+    """The visible text of a page with the span of every contact block
+
+    Blocks (div/section/article/li) are stored in document order as
+    [start, end, parent] where start/end are offsets into `text` and parent is
+    the index of the enclosing block (or None). Apart from inline tags, element
+    boundaries are joined with a line break so that e.g. a heading and the
+    paragraph after it never run together.
+    """
+
+    def __init__(self, soup):
+        self.blocks = []
+        self.links = []
+        # Offset of every text run and the innermost block it belongs to
+        self.run_starts = []
+        self.run_blocks = []
+
+        parts = []
+        length = 0
+        stack = [(iter(soup.children), None, None, False)]
+
+        while stack:
+            children, block, own_block, separate = stack[-1]
+            child = next(children, None)
+
+            if child is None:
+                stack.pop()
+                if separate:
+                    parts.append('\n')
+                    length += 1
+                if own_block is not None:
+                    self.blocks[own_block][1] = length
+                continue
+
+            if isinstance(child, Tag):
+                if child.name == 'a' and child.get('href'):
+                    self.links.append(child['href'])
+                separate = child.name not in INLINE_TAGS
+                if separate:
+                    parts.append('\n')
+                    length += 1
+                own = None
+                if child.name in BLOCK_TAGS:
+                    own = len(self.blocks)
+                    self.blocks.append([length, None, block])
+                stack.append((iter(child.children), block if own is None else own, own, separate))
+            elif type(child) in TEXT_TYPES and child:
+                self.run_starts.append(length)
+                self.run_blocks.append(block)
+                parts.append(child)
+                length += len(child)
+
+        self.text = ''.join(parts)
+
+    def block_at(self, start, end):
+        """Smallest block containing text[start:end]"""
+        index = bisect_right(self.run_starts, start) - 1
+        block = self.run_blocks[index] if index >= 0 else None
+        while block is not None and self.blocks[block][1] < end:
+            block = self.blocks[block][2]
+        return block
+
+
+def _first_in(positions, start, end):
+    """Index of the first position within [start, end), or None"""
+    index = bisect_right(positions, start - 1)
+    if index < len(positions) and positions[index] < end:
+        return index
+    return None
+
+
+def extract_contacts(page):
+    """Structured contacts (name, title, email, phone) from a PageText
+
+    Every email is tied to the smallest block around it. If that block has no
+    name or title, the search climbs to the enclosing blocks, but never into a
+    block that also holds a different email (that name would belong to someone
+    else). Within the chosen block the name closest before the email wins (or
+    the first one after it), the title is the most senior keyword and the phone
+    is the first number. Capitalized words holding a title keyword ('Sales
+    Manager') are not names. Emails without a name or title give no contact.
+    """
+    text = page.text
+    emails = [(m.start(), m.end(), m.group()) for m in EMAIL.finditer(text)]
+    titles = [(m.start(), m.group().lower()) for m in TITLE.finditer(text)]
+    title_starts = [start for start, _ in titles]
+    names = [(m.start(), m.group().strip()) for m in NAME.finditer(text)
+             if _first_in(title_starts, m.start(), m.end()) is None]
+    phones = [(m.start(), m.group().strip()) for m in PHONE.finditer(text)]
+    email_starts = [start for start, _, _ in emails]
+    name_starts = [start for start, _ in names]
+    phone_starts = [start for start, _ in phones]
+
+    def other_email(email, start, end):
+        index = _first_in(email_starts, start, end)
+        while index is not None and index < len(emails) and emails[index][0] < end:
+            if emails[index][2] != email:
+                return True
+            index += 1
+        return False
+
+    contacts = []
+    for email_start, email_end, email in emails:
+        block = page.block_at(email_start, email_end)
+        while block is not None:
+            start, end, parent = page.blocks[block]
+            name_index = _first_in(name_starts, start, end)
+            title_index = _first_in(title_starts, start, end)
+            if name_index is not None or title_index is not None:
+                break
+            if parent is None or other_email(email, *page.blocks[parent][:2]):
+                block = None
+                break
+            block = parent
+
+        if block is None:
+            continue
+
+        name = None
+        if name_index is not None:
+            closest = bisect_right(name_starts, email_start) - 1
+            name = names[closest if closest >= name_index else name_index][1]
+
+        title = None
+        if title_index is not None:
+            index = title_index
+            best = None
+            while index < len(titles) and titles[index][0] < end:
+                rank = TITLE_RANK[titles[index][1]]
+                if best is None or rank < best:
+                    best = rank
+                index += 1
+            title = TITLE_KEYWORDS[best]
+
+        phone_index = _first_in(phone_starts, start, end)
+        contacts.append({
+            'name': name,
+            'title': title,
+            'email': email,
+            'phone': phones[phone_index][1] if phone_index is not None else None
+        })
+
+    return contacts
+
+
+def extract_emails(text):
+    """Plain and obfuscated ('sales (at) firm.fi') emails in order of appearance, without duplicates"""
+    emails = EMAIL.findall(text)
+    for local, domain in OBFUSCATED_EMAIL.findall(text):
+        email = f"{local}@{domain}"
+        if email not in emails:
+            emails.append(email)
+    return emails
+
+
+def extract_phones(text):
+    return [m.group() for m in PHONE.finditer(text)]
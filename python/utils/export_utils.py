@@ -2,130 +2,351 @@
 Export utilities for CSV and JSON
 """
 import csv
+import io
+import itertools
+import json
+import os
+from collections import deque
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+
+def ndjson_path(filename):
+    """NDJSON file that backs a JSON results filename (companies_leads.json -> companies_leads.ndjson)"""
+    if filename.endswith('.json'):
+        filename = filename[:-len('.json')]
+    return filename + '.ndjson'
+
+
+class NDJSONWriter:
+    """Appends leads to an NDJSON file, one JSON object per line
+
+    Each lead is written and flushed as soon as it is ready, so a crash keeps
+    every finished lead on disk. The writer itself only holds the count and the
+    last `keep_recent` leads; the file is the complete result.
+
+    When appending, a partial last line left by a crash mid-write is cut off
+    first, so the next lead starts on a line of its own.
+    """
+    
+    def __init__(self, filename, append=False, keep_recent=0):
+        self.filename = filename
+        self.count = 0
+        self.recent = deque(maxlen=keep_recent)
+        if append and os.path.exists(filename):
+            _truncate_partial_line(filename)
+        self.file = open(filename, 'a' if append else 'w', encoding='utf-8')
+    
+    def write(self, lead):
+        self.file.write(json.dumps(lead, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.count += 1
+        self.recent.append(lead)
+    
+    def publish(self, status):
+        """Show the file, the number of leads written and the latest ones in a status dict"""
+        status['results'] = list(self.recent)
+        status['results_count'] = self.count
+        status['results_file'] = self.filename
+    
+    def close(self):
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _truncate_partial_line(filename, chunk_size=64 * 1024):
+    """Cut a file back to just after its last line break (to empty if it has none)"""
+    with open(filename, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - chunk_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            end = start
+        f.truncate(0)
+
+
+def iter_ndjson(filename):
+    """Yield leads from an NDJSON file one at a time
+
+    A truncated last line (left by a crash mid-write) is skipped.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def iter_leads(filename):
+    """Yield the leads of a JSON results file, preferring its NDJSON counterpart
+
+    Only a legacy JSON array file (written before results were streamed) has
+    to be loaded whole.
+    """
+    results_file = ndjson_path(filename)
+    if os.path.exists(results_file):
+        yield from iter_ndjson(results_file)
+        return
+    with open(filename, 'r', encoding='utf-8') as f:
+        yield from json.load(f)
+
+
+def iter_ndjson_lines(leads):
+    """Yield leads as NDJSON text, one line per lead"""
+    for lead in leads:
+        yield json.dumps(lead, ensure_ascii=False) + '\n'
+
+
+def iter_json_array(filename):
+    """Stream an NDJSON file as the text of a JSON array, chunk by chunk"""
+    yield '['
+    for idx, lead in enumerate(iter_ndjson(filename)):
+        yield (',\n' if idx else '\n') + json.dumps(lead, ensure_ascii=False)
+    yield '\n]\n'
+
+
+# Define CSV columns
+CSV_FIELDNAMES = [
+    'Company Name',
+    'Business ID',
+    'Business Line',
+    'Business Line Code',
+    'Website',
+    'Street',
+    'City',
+    'Post Code',
+    'Registration Date',
+    'Status',
+    # Finder.fi data
+    'Verified on Finder',
+    'Finder URL',
+    'Founded',
+    'Employees',
+    'Revenue',
+    'Operating Profit',
+    'Financial Year',
+    'Finder Address',
+    'Finder Phone',
+    'Finder Email',
+    'Finder Website',
+    'Key People Count',
+    'Key People Names',
+    # Contact info
+    'Emails',
+    'Phones',
+    'Contact Names',
+    'Contact Titles',
+    'Contact Emails',
+    'Contact Phones',
+    'Social Media',
+    # AI Insights
+    'AI Company Size',
+    'AI Growth Stage',
+    'AI Best Contact Approach',
+    'AI Priority Score'
+]
+
+
+def _lead_to_row(lead):
+    """Flatten a lead into a CSV row keyed by CSV_FIELDNAMES
+
+    Missing sections may be absent or None (database rows).
+    """
+    # Extract basic info
+    row = {
+        'Company Name': lead.get('name', ''),
+        'Business ID': lead.get('business_id', ''),
+        'Business Line': lead.get('main_business_line', ''),
+        'Business Line Code': lead.get('main_business_line_code', ''),
+        'Website': lead.get('website', ''),
+        'Street': (lead.get('address') or {}).get('street', ''),
+        'City': (lead.get('address') or {}).get('city', ''),
+        'Post Code': (lead.get('address') or {}).get('post_code', ''),
+        'Registration Date': lead.get('registration_date', ''),
+        'Status': lead.get('status', ''),
+    }
+
+    # Extract Finder.fi data
+    finder_data = lead.get('finder_data') or {}
+    if finder_data:
+        row['Verified on Finder'] = 'Yes' if finder_data.get('verified_on_finder') else 'No'
+        row['Finder URL'] = finder_data.get('finder_url', '')
+
+        basic_info = finder_data.get('basic_info') or {}
+        row['Founded'] = basic_info.get('founded', '')
+        row['Employees'] = basic_info.get('employees', '')
+
+        financials = finder_data.get('financials') or {}
+        row['Revenue'] = financials.get('revenue', '')
+        row['Operating Profit'] = financials.get('operating_profit', '')
+        row['Financial Year'] = financials.get('financial_year', '')
+
+        contact = finder_data.get('contact') or {}
+        row['Finder Address'] = contact.get('address', '')
+        row['Finder Phone'] = contact.get('phone', '')
+        row['Finder Email'] = contact.get('email', '')
+        row['Finder Website'] = contact.get('website', '')
+
+        key_people = finder_data.get('key_people') or []
+        row['Key People Count'] = len(key_people)
+        row['Key People Names'] = '; '.join([p.get('name', '') for p in key_people if p.get('name')])
+
+    # Extract contact info
+    contact_info = lead.get('contact_info') or {}
+    if contact_info:
+        emails = contact_info.get('emails') or []
+        row['Emails'] = '; '.join(emails)
+
+        phones = contact_info.get('phones') or []
+        row['Phones'] = '; '.join(phones)
+
+        contacts = contact_info.get('contacts') or []
+        if contacts:
+            row['Contact Names'] = '; '.join([c.get('name', '') for c in contacts if c.get('name')])
+            row['Contact Titles'] = '; '.join([c.get('title', '') for c in contacts if c.get('title')])
+            row['Contact Emails'] = '; '.join([c.get('email', '') for c in contacts if c.get('email')])
+            row['Contact Phones'] = '; '.join([c.get('phone', '') for c in contacts if c.get('phone')])
+
+        social_media = contact_info.get('social_media') or {}
+        social_links = [f"{k}: {v}" for k, v in social_media.items()]
+        row['Social Media'] = '; '.join(social_links)
+
+    # Extract AI insights
+    ai_insights = lead.get('ai_insights') or {}
+    if ai_insights:
+        row['AI Company Size'] = ai_insights.get('company_size', '')
+        row['AI Growth Stage'] = ai_insights.get('growth_stage', '')
+        row['AI Best Contact Approach'] = ai_insights.get('best_contact_approach', '')
+        row['AI Priority Score'] = ai_insights.get('priority_score', '')
+    
+    return row
+
+
+def iter_csv(leads, chunk_size=100):
+    """Yield a CSV export of `leads` as text chunks of up to chunk_size rows
+
+    leads can be any iterable (a list, iter_ndjson, a database query), so a
+    chunked HTTP response can start sending before the last lead is read. The
+    first chunk starts with a UTF-8 BOM, like the files written by export_to_csv.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDNAMES)
+    buffer.write('\ufeff')
+    writer.writeheader()
+    rows = 0
+    
+    for lead in leads:
+        writer.writerow(_lead_to_row(lead))
+        rows += 1
+        if rows >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    
+    yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back in chunks
+
+    ParquetWriter records byte offsets with tell(), so the position keeps
+    counting while the buffered bytes are drained.
+    """
+    
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(leads, batch_size=10000):
+    """Yield a Parquet export of `leads` as byte chunks, one row group at a time
+
+    Columns are the CSV columns (CSV_FIELDNAMES), stored as strings; missing
+    values are stored as nulls. Requires the optional pyarrow package.
+    """
+    if pa is None:
+        raise RuntimeError('Parquet export requires the pyarrow package')
+    
+    schema = pa.schema([(name, pa.string()) for name in CSV_FIELDNAMES])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    batch = []
+    
+    def write_batch():
+        columns = {name: [None if row.get(name) is None else str(row[name]) for row in batch]
+                   for name in CSV_FIELDNAMES}
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+        batch.clear()
+    
+    for lead in leads:
+        batch.append(_lead_to_row(lead))
+        if len(batch) >= batch_size:
+            write_batch()
+            yield sink.drain()
+    
+    if batch:
+        write_batch()
+    writer.close()
+    yield sink.drain()
 
 
 def export_to_csv(leads, filename='companies_leads.csv'):
-    """Export leads to CSV format"""
-    if not leads:
+    """Export leads to CSV format
+    
+    leads can be a list or any iterable (e.g. iter_ndjson), which is consumed
+    one lead at a time.
+    """
+    leads = iter(leads)
+    first_lead = next(leads, None)
+    if first_lead is None:
         return False
     
+    exported = 0
     try:
         with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            # Define CSV columns
-            fieldnames = [
-                'Company Name',
-                'Business ID',
-                'Business Line',
-                'Business Line Code',
-                'Website',
-                'Street',
-                'City',
-                'Post Code',
-                'Registration Date',
-                'Status',
-                # Finder.fi data
-                'Verified on Finder',
-                'Finder URL',
-                'Founded',
-                'Employees',
-                'Revenue',
-                'Operating Profit',
-                'Financial Year',
-                'Finder Address',
-                'Finder Phone',
-                'Finder Email',
-                'Finder Website',
-                'Key People Count',
-                'Key People Names',
-                # Contact info
-                'Emails',
-                'Phones',
-                'Contact Names',
-                'Contact Titles',
-                'Contact Emails',
-                'Contact Phones',
-                'Social Media',
-                # AI Insights
-                'AI Company Size',
-                'AI Growth Stage',
-                'AI Best Contact Approach',
-                'AI Priority Score'
-            ]
-            
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
             writer.writeheader()
             
-            for lead in leads:
-                # Extract basic info
-                row = {
-                    'Company Name': lead.get('name', ''),
-                    'Business ID': lead.get('business_id', ''),
-                    'Business Line': lead.get('main_business_line', ''),
-                    'Business Line Code': lead.get('main_business_line_code', ''),
-                    'Website': lead.get('website', ''),
-                    'Street': lead.get('address', {}).get('street', ''),
-                    'City': lead.get('address', {}).get('city', ''),
-                    'Post Code': lead.get('address', {}).get('post_code', ''),
-                    'Registration Date': lead.get('registration_date', ''),
-                    'Status': lead.get('status', ''),
-                }
-                
-                # Extract Finder.fi data
-                finder_data = lead.get('finder_data', {})
-                if finder_data:
-                    row['Verified on Finder'] = 'Yes' if finder_data.get('verified_on_finder') else 'No'
-                    row['Finder URL'] = finder_data.get('finder_url', '')
-                    
-                    basic_info = finder_data.get('basic_info', {})
-                    row['Founded'] = basic_info.get('founded', '')
-                    row['Employees'] = basic_info.get('employees', '')
-                    
-                    financials = finder_data.get('financials', {})
-                    row['Revenue'] = financials.get('revenue', '')
-                    row['Operating Profit'] = financials.get('operating_profit', '')
-                    row['Financial Year'] = financials.get('financial_year', '')
-                    
-                    contact = finder_data.get('contact', {})
-                    row['Finder Address'] = contact.get('address', '')
-                    row['Finder Phone'] = contact.get('phone', '')
-                    row['Finder Email'] = contact.get('email', '')
-                    row['Finder Website'] = contact.get('website', '')
-                    
-                    key_people = finder_data.get('key_people', [])
-                    row['Key People Count'] = len(key_people)
-                    row['Key People Names'] = '; '.join([p.get('name', '') for p in key_people if p.get('name')])
-                
-                # Extract contact info
-                contact_info = lead.get('contact_info', {})
-                if contact_info:
-                    emails = contact_info.get('emails', [])
-                    row['Emails'] = '; '.join(emails)
-                    
-                    phones = contact_info.get('phones', [])
-                    row['Phones'] = '; '.join(phones)
-                    
-                    contacts = contact_info.get('contacts', [])
-                    if contacts:
-                        row['Contact Names'] = '; '.join([c.get('name', '') for c in contacts if c.get('name')])
-                        row['Contact Titles'] = '; '.join([c.get('title', '') for c in contacts if c.get('title')])
-                        row['Contact Emails'] = '; '.join([c.get('email', '') for c in contacts if c.get('email')])
-                        row['Contact Phones'] = '; '.join([c.get('phone', '') for c in contacts if c.get('phone')])
-                    
-                    social_media = contact_info.get('social_media', {})
-                    social_links = [f"{k}: {v}" for k, v in social_media.items()]
-                    row['Social Media'] = '; '.join(social_links)
-                
-                # Extract AI insights
-                ai_insights = lead.get('ai_insights', {})
-                if ai_insights:
-                    row['AI Company Size'] = ai_insights.get('company_size', '')
-                    row['AI Growth Stage'] = ai_insights.get('growth_stage', '')
-                    row['AI Best Contact Approach'] = ai_insights.get('best_contact_approach', '')
-                    row['AI Priority Score'] = ai_insights.get('priority_score', '')
-                
-                writer.writerow(row)
+            for lead in itertools.chain([first_lead], leads):
+                writer.writerow(_lead_to_row(lead))
+                exported += 1
         
-        print(f"✓ Exported {len(leads)} leads to {filename}")
+        print(f"✓ Exported {exported} leads to {filename}")
         return True
         
     except Exception as e:
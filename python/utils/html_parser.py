@@ -0,0 +1,29 @@
+"""
+HTML parsing with a configurable BeautifulSoup backend
+"""
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from config import HTML_PARSER
+
+
+PARSERS = ('lxml', 'html.parser')
+
+
+def resolve_parser(name):
+    """Validate a backend name; fall back to 'html.parser' when lxml is missing"""
+    if name not in PARSERS:
+        raise ValueError(f"Unknown HTML parser '{name}' (expected one of: {', '.join(PARSERS)})")
+    try:
+        BeautifulSoup('', name)
+    except FeatureNotFound:
+        print(f"⚠ HTML parser '{name}' is not installed, using 'html.parser'")
+        return 'html.parser'
+    return name
+
+
+parser = resolve_parser(HTML_PARSER)
+
+
+def parse_html(html, backend=None):
+    """Parse a page with the configured backend (or `backend`, e.g. for benchmarks)"""
+    return BeautifulSoup(html, backend or parser)
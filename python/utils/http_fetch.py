@@ -0,0 +1,79 @@
+"""
+Bounded, streaming reads of company web pages
+"""
+import codecs
+import re
+
+from config import MAX_PAGE_BYTES
+
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_-]+)', re.IGNORECASE)
+
+
+class NotHTML(Exception):
+    """The server answered with something other than an HTML page"""
+
+
+def is_html(content_type):
+    """True for HTML content types; a missing Content-Type is given the benefit of the doubt"""
+    if not content_type:
+        return True
+    return content_type.split(';', 1)[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def header_charset(content_type):
+    """charset parameter of a Content-Type header, or None"""
+    for param in (content_type or '').split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            return value.strip().strip('"\'') or None
+    return None
+
+
+def _codec(name):
+    try:
+        return codecs.lookup(name).name if name else None
+    except LookupError:
+        return None
+
+
+class BodyReader:
+    """Incrementally decode a response body up to max_bytes
+
+    The charset comes from the Content-Type header, else from a <meta charset>
+    in the first chunk, else UTF-8. Bytes past the limit are dropped, so a
+    fetch holds at most max_bytes of body (plus its decoded text). A body is
+    only `truncated` when bytes past the limit actually arrive: one of exactly
+    max_bytes is complete.
+    """
+
+    def __init__(self, charset=None, max_bytes=MAX_PAGE_BYTES):
+        self.charset = _codec(charset)
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.truncated = False
+        self.decoder = None
+        self.parts = []
+
+    def feed(self, chunk):
+        """Add a chunk; returns False once the body turns out to exceed the limit (stop reading)"""
+        if self.decoder is None:
+            if not self.charset:
+                match = META_CHARSET.search(chunk, 0, 2048)
+                self.charset = _codec(match.group(1).decode('ascii')) if match else None
+            self.decoder = codecs.getincrementaldecoder(self.charset or 'utf-8')(errors='replace')
+
+        room = self.max_bytes - self.received
+        if len(chunk) > room:
+            self.truncated = True
+            chunk = chunk[:room]
+        self.received += len(chunk)
+        self.parts.append(self.decoder.decode(chunk))
+        return not self.truncated
+
+    def text(self):
+        if self.decoder is not None:
+            self.parts.append(self.decoder.decode(b'', final=True))
+            self.decoder = None
+        return ''.join(self.parts)
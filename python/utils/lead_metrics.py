@@ -0,0 +1,115 @@
+"""
+Typed lead fields derived from the contact, Finder.fi and AI insight data
+"""
+import re
+
+
+NUMBER = re.compile(r'\d[\d\s.,]*')
+MILLIONS = re.compile(r'milj|meur|\d\s*m\s*(?:€|eur)')
+THOUSANDS = re.compile(r'tuhat|teur|\d\s*[kt]\s*(?:€|eur)')
+YEAR = re.compile(r'\b(?:19|20)\d{2}\b')
+
+PRIORITY_SCORES = {'high': 3, 'medium': 2, 'low': 1}
+
+# Typed columns derived from each lead section
+DERIVED_COLUMNS = {
+    'contact_info': ('email_count',),
+    'finder_data': ('verified_on_finder', 'revenue_eur', 'employee_count', 'financial_year'),
+    'ai_insights': ('priority_score',),
+}
+
+
+def parse_revenue(value):
+    """Parse a revenue figure like '239 000 €', '1,2 miljoonaa' or '500 tuhatta' into euros"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    text = str(value).lower().replace('\xa0', ' ')
+    match = NUMBER.search(text)
+    if not match:
+        return None
+
+    # Finnish figures use spaces between thousands and a decimal comma
+    number = match.group().strip().replace(' ', '')
+    if ',' in number and '.' in number:
+        number = number.replace('.', '').replace(',', '.')
+    elif re.fullmatch(r'\d{1,3}(?:,\d{3})+', number):
+        number = number.replace(',', '')
+    elif re.fullmatch(r'\d{1,3}(?:\.\d{3})+', number):
+        number = number.replace('.', '')
+    else:
+        number = number.replace(',', '.')
+
+    try:
+        amount = float(number.rstrip('.'))
+    except ValueError:
+        return None
+
+    if MILLIONS.search(text):
+        amount *= 1_000_000
+    elif THOUSANDS.search(text):
+        amount *= 1_000
+    return int(round(amount))
+
+
+def parse_employee_count(value):
+    """Employee count; for a range like '10-19' the lower bound"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return value
+    match = re.search(r'\d+', str(value).replace('\xa0', '').replace(' ', ''))
+    return int(match.group()) if match else None
+
+
+def parse_year(value):
+    if value is None or value == '':
+        return None
+    match = YEAR.search(str(value))
+    return int(match.group()) if match else None
+
+
+def count_emails(contact_info):
+    """Number of distinct emails in contact_info (emails plus contact persons)"""
+    emails = set(contact_info.get('emails') or [])
+    emails.update(c['email'] for c in contact_info.get('contacts') or [] if c.get('email'))
+    return len(emails)
+
+
+def priority_score(value):
+    """AI priority 'High'/'Medium'/'Low' as 3/2/1"""
+    if not value:
+        return None
+    return PRIORITY_SCORES.get(str(value).strip().lower())
+
+
+def derive_company_columns(lead):
+    """Typed column values for a lead
+
+    A field is None when the section it comes from is missing, so that a
+    save without (say) Finder.fi data keeps the stored values.
+    """
+    contact_info = lead.get('contact_info')
+    finder_data = lead.get('finder_data')
+    ai_insights = lead.get('ai_insights')
+
+    columns = {
+        'email_count': count_emails(contact_info) if contact_info else None,
+        'verified_on_finder': None,
+        'revenue_eur': None,
+        'employee_count': None,
+        'financial_year': None,
+        'priority_score': priority_score(ai_insights.get('priority_score')) if ai_insights else None,
+    }
+
+    if finder_data:
+        basic_info = finder_data.get('basic_info') or {}
+        financials = finder_data.get('financials') or {}
+        columns['verified_on_finder'] = bool(finder_data.get('verified_on_finder'))
+        columns['revenue_eur'] = parse_revenue(financials.get('revenue'))
+        columns['employee_count'] = parse_employee_count(basic_info.get('employees'))
+        columns['financial_year'] = parse_year(financials.get('financial_year'))
+
+    return columns
@@ -0,0 +1,75 @@
+"""
+Precompiled patterns and keyword/domain lookups for the scraper heuristics
+"""
+import re
+from urllib.parse import unquote
+
+
+EMAIL = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+OBFUSCATED_EMAIL = re.compile(
+    r'\b([A-Za-z0-9._%+-]+)\s*[\(\[]\s*at\s*[\)\]]\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})\b', re.IGNORECASE
+)
+PHONE = re.compile(r'\+?358[\s-]?\d{1,2}[\s-]?\d{3,4}[\s-]?\d{3,4}|0\d{1,2}[\s-]?\d{3,4}[\s-]?\d{3,4}')
+# Names never cross a line (element) break
+NAME = re.compile(r'[A-Z][a-z]+[^\S\n]+[A-Z][a-z]+(?:[^\S\n]+[A-Z][a-z]+)?')
+
+# Business directories and social media: never a company's own website.
+# A domain also covers its subdomains (www.finder.fi, fi.linkedin.com).
+SKIP_DOMAINS = frozenset([
+    'finder.fi', 'fonecta.fi', 'kauppalehti.fi', 'asiakastieto.fi',
+    'vastuugroup.fi', 'yrittajat.fi', 'wikipedia.org', 'linkedin.com',
+    'facebook.com', 'yellow.fi', 'taloyritys.fi', 'suomenyritykset.fi',
+    'dnb.com', 'bisnode.fi', 'prh.fi', 'ytj.fi', 'finder.com'
+])
+
+# Generic customer service mailboxes (local part endings: 'info@', 'tuki@', ...)
+SKIP_EMAIL_LOCALS = ('info', 'asiakaspalvelu', 'customerservice', 'tuki', 'support', 'help', 'helpdesk')
+
+
+# Host of an absolute ('https://...'), protocol-relative ('//...') or scheme-less ('www.firm.fi/...') URL
+URL_HOST = re.compile(r'\s*(?>(?:(?:[A-Za-z][A-Za-z0-9+.-]*:)?//)?)(?:[^@/?#\s]*@)?([^:/?#\s\[\]]+)')
+REDIRECT_HOSTS = frozenset(['duckduckgo.com'])
+REDIRECT_TARGET = re.compile(r'/l/\?(?:[^#]*&)?uddg=([^&#]+)')
+
+
+def url_host(url):
+    """Lowercase host of a URL, also without a scheme ('www.firm.fi/yhteystiedot' -> 'www.firm.fi')"""
+    match = URL_HOST.match(url)
+    return match.group(1).lower().rstrip('.') if match else None
+
+
+def host_in(host, domains):
+    """True if host is one of `domains` or a subdomain of one (a set lookup per label)"""
+    while host:
+        if host in domains:
+            return True
+        host = host.partition('.')[2]
+    return False
+
+
+def unwrap_redirect(url):
+    """Target of a DuckDuckGo result redirect (//duckduckgo.com/l/?uddg=...), else url unchanged"""
+    host = url_host(url)
+    if host and host_in(host, REDIRECT_HOSTS):
+        target = REDIRECT_TARGET.search(url)
+        if target:
+            return unquote(target.group(1).replace('+', ' '))
+    return url
+
+
+def is_directory_url(url):
+    """True if the URL points to a business directory or social media site (or has no host)"""
+    host = url_host(url)
+    if host and host_in(host, REDIRECT_HOSTS):
+        host = url_host(unwrap_redirect(url))
+    return not host or host_in(host, SKIP_DOMAINS)
+
+
+def is_sales_email(email):
+    """Check if email is likely a sales/business contact
+
+    Generic customer service mailboxes are skipped; sales addresses
+    (myynti@, sales@), personal addresses (firstname.lastname@) and anything
+    else are accepted.
+    """
+    return not email.rpartition('@')[0].lower().endswith(SKIP_EMAIL_LOCALS)
@@ -0,0 +1,113 @@
+"""
+Per-host token bucket rate limiting for outgoing requests
+"""
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+from config import RATE_LIMITS, DEFAULT_RATE_LIMIT
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` requests per second with bursts of `capacity`
+
+    Callers reserve a token up front (the balance may go negative) and then sleep
+    outside the lock for their share of the deficit, so waiting threads and
+    coroutines are served in arrival order and never block each other while
+    sleeping.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return the number of seconds to wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Block the calling thread until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        """Wait on the event loop until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """Keeps one token bucket per host
+
+    Hosts listed in `budgets` (matched on the host or any parent domain, so
+    'finder.fi' also covers 'www.finder.fi') share that budget. Every other host
+    gets its own bucket with the default budget.
+    """
+
+    def __init__(self, budgets=None, default=(1, 1)):
+        self.budgets = dict(budgets or {})
+        self.default = default
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _host(url):
+        host = urlparse(url if '://' in url else f'//{url}').hostname or ''
+        return host[4:] if host.startswith('www.') else host
+
+    def _budget_key(self, host):
+        parts = host.split('.')
+        for i in range(len(parts) - 1):
+            suffix = '.'.join(parts[i:])
+            if suffix in self.budgets:
+                return suffix
+        return host
+
+    def bucket_for(self, url):
+        """Get the token bucket responsible for the URL's host"""
+        key = self._budget_key(self._host(url))
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            with self.lock:
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    rate, capacity = self.budgets.get(key, self.default)
+                    bucket = self.buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+    def budget(self, url):
+        """(rate, capacity) budget that applies to a URL or host"""
+        return self.budgets.get(self._budget_key(self._host(url)), self.default)
+
+    def configure(self, host, rate, capacity=1):
+        """Set (or replace) the budget of a host"""
+        with self.lock:
+            self.budgets[host] = (rate, capacity)
+            self.buckets.pop(host, None)
+
+    def acquire(self, url):
+        """Wait (blocking) until a request to `url` fits in its host's budget"""
+        return self.bucket_for(url).acquire()
+
+    async def acquire_async(self, url):
+        """Wait (asyncio) until a request to `url` fits in its host's budget"""
+        return await self.bucket_for(url).acquire_async()
+
+
+# Shared limiter used by the scraper, the async scraper and the Finder.fi service
+rate_limiter = HostRateLimiter(RATE_LIMITS, DEFAULT_RATE_LIMIT)
@@ -1,9 +1,17 @@
 import requests
 import json
-import time
-from bs4 import BeautifulSoup
-import re
+from collections import namedtuple
 from urllib.parse import urlparse
+from config import FETCH_CHUNK_BYTES
+from utils.rate_limiter import rate_limiter
+from utils.html_parser import parse_html
+from utils.http_fetch import BodyReader, NotHTML, header_charset, is_html
+from utils.matchers import is_directory_url, is_sales_email, unwrap_redirect
+from utils.contact_extractor import PageText, extract_contacts, extract_emails, extract_phones
+
+# A fetched HTML page: final URL (after redirects) and decoded text
+FetchedPage = namedtuple('FetchedPage', ['url', 'text'])
+
 
 class YTJCompanyScraper:
     def __init__(self):
@@ -12,13 +20,6 @@ class YTJCompanyScraper:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
-        # Domains to skip (business directories)
-        self.skip_domains = [
-            'finder.fi', 'fonecta.fi', 'kauppalehti.fi', 'asiakastieto.fi',
-            'vastuugroup.fi', 'yrittajat.fi', 'wikipedia.org', 'linkedin.com',
-            'facebook.com', 'yellow.fi', 'taloyritys.fi', 'suomenyritykset.fi',
-            'dnb.com', 'bisnode.fi', 'prh.fi', 'ytj.fi', 'finder.com'
-        ]
     
     def get_companies(self, main_business_line=None, location=None, company_form=None, page=1):
         """Fetch companies from YTJ API"""
@@ -37,6 +38,7 @@ class YTJCompanyScraper:
         try:
             print(f"  API Request: {url}")
             print(f"  Parameters: {params}")
+            rate_limiter.acquire(url)
             response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
@@ -50,8 +52,7 @@ class YTJCompanyScraper:
         """Check if URL is not a business directory"""
         if not url:
             return False
-        url_lower = url.lower()
-        return not any(domain in url_lower for domain in self.skip_domains)
+        return not is_directory_url(url)
     
     def normalize_url(self, url):
         """Add https:// if scheme is missing"""
@@ -62,17 +63,41 @@ class YTJCompanyScraper:
             url = 'https://' + url
         return url
     
+    def fetch_page(self, url):
+        """Fetch an HTML page with a bounded, streamed read
+        
+        Non-HTML responses are rejected from their headers before any of the
+        body is downloaded; the body is decoded as it arrives and reading stops
+        after MAX_PAGE_BYTES.
+        """
+        rate_limiter.acquire(url)
+        with self.session.get(url, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type')
+            if not is_html(content_type):
+                raise NotHTML(content_type)
+            
+            reader = BodyReader(header_charset(content_type))
+            for chunk in response.iter_content(FETCH_CHUNK_BYTES):
+                if not reader.feed(chunk):
+                    print(f"  ⚠ {url} is larger than {reader.max_bytes} bytes, using the first part")
+                    break
+            return FetchedPage(response.url, reader.text())
+    
     def try_fetch_url(self, url):
-        """Try to fetch URL, with fallback to www/non-www version"""
+        """Try to fetch URL, with fallback to www/non-www version
+        
+        Returns a FetchedPage (url, text), or None.
+        """
         if not url:
             return None
         
         url = self.normalize_url(url)
         
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response
+            return self.fetch_page(url)
+        except NotHTML:
+            return None
         except:
             # Try alternate version (add/remove www)
             try:
@@ -83,9 +108,7 @@ class YTJCompanyScraper:
                     # Try with www
                     alternate_url = url.replace('://', '://www.')
                 
-                response = self.session.get(alternate_url, timeout=10)
-                response.raise_for_status()
-                return response
+                return self.fetch_page(alternate_url)
             except:
                 return None
     
@@ -96,15 +119,16 @@ class YTJCompanyScraper:
             # Search only company name for best results
             data = {'q': company_name}
             
+            rate_limiter.acquire(search_url)
             response = self.session.post(search_url, data=data, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = parse_html(response.text)
             
             # Find result links and filter out directories
             results = soup.find_all('a', class_='result__a')
             for result in results[:5]:  # Check first 5 results
                 url = result.get('href')
                 if self.is_valid_website(url):
-                    return url
+                    return unwrap_redirect(url)
             
             return None
         except Exception as e:
@@ -113,25 +137,7 @@ class YTJCompanyScraper:
     
     def is_sales_email(self, email):
         """Check if email is likely a sales/business contact"""
-        email_lower = email.lower()
-        
-        # Skip generic customer service emails
-        skip_keywords = ['info@', 'asiakaspalvelu@', 'customerservice@', 
-                        'tuki@', 'support@', 'help@', 'helpdesk@']
-        if any(keyword in email_lower for keyword in skip_keywords):
-            return False
-        
-        # Prefer sales/business emails
-        sales_keywords = ['myynti@', 'sales@', 'business@', 'b2b@', 
-                         'yritys@', 'contact@', 'office@']
-        if any(keyword in email_lower for keyword in sales_keywords):
-            return True
-        
-        # Accept personal emails (firstname.lastname@)
-        if re.match(r'^[a-z]+\.[a-z]+@', email_lower):
-            return True
-        
-        return True  # Accept others by default
+        return is_sales_email(email)
     
     def extract_email_domain(self, url):
         """Extract likely email domain from URL"""
@@ -148,124 +154,99 @@ class YTJCompanyScraper:
         except:
             return None
     
+    @staticmethod
+    def _empty_contact_info():
+        return {
+            'emails': [],
+            'phones': [],
+            'contacts': [],  # Structured contacts with name, title, email, phone
+            'social_media': {}
+        }
+    
+    def find_contact_links(self, soup, url):
+        """Find links to contact/about/team pages on a parsed page"""
+        contact_links = []
+        for link in soup.find_all('a', href=True):
+            href_lower = link['href'].lower()
+            text_lower = link.get_text().lower()
+            if any(word in href_lower or word in text_lower for word in 
+                   ['contact', 'yhteystiedot', 'kontakt', 'about', 'meistä', 'team', 'tiimi']):
+                full_url = requests.compat.urljoin(url, link['href'])
+                contact_links.append(full_url)
+        return contact_links
+    
     def extract_contact_info(self, url, company_name=None):
         """Scrape contact information from website"""
         if not url:
             return {}
         
         url = self.normalize_url(url)
-        email_domain = self.extract_email_domain(url)
-        
-        contact_info = {
-            'emails': [],
-            'phones': [],
-            'contacts': [],  # Structured contacts with name, title, email, phone
-            'social_media': {}
-        }
+        pages = []
         
         try:
-            response = self.try_fetch_url(url)
-            if not response:
-                return contact_info
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
+            page = self.try_fetch_url(url)
+            if not page:
+                return self._empty_contact_info()
             
-            # Try to find contact page
-            contact_links = []
-            for link in soup.find_all('a', href=True):
-                href_lower = link['href'].lower()
-                text_lower = link.get_text().lower()
-                if any(word in href_lower or word in text_lower for word in 
-                       ['contact', 'yhteystiedot', 'kontakt', 'about', 'meistä', 'team', 'tiimi']):
-                    full_url = requests.compat.urljoin(url, link['href'])
-                    contact_links.append(full_url)
+            soup = parse_html(page.text)
             
-            # Scrape main page and contact page
-            pages_to_scrape = [url] + contact_links[:2]
-            all_text = ""
-            all_soups = []
-            
-            for page_url in pages_to_scrape:
+            # Scrape main page (already fetched) and first two contact pages;
+            # links are relative to the page's final URL (after redirects)
+            pages.append(page.text)
+            for page_url in self.find_contact_links(soup, page.url)[:2]:
                 try:
-                    page_response = self.try_fetch_url(page_url)
-                    if not page_response:
-                        continue
-                    page_soup = BeautifulSoup(page_response.text, 'html.parser')
-                    all_soups.append(page_soup)
-                    all_text += " " + page_soup.get_text()
-                    
-                    # Also check for mailto links
-                    for mailto in page_soup.find_all('a', href=re.compile(r'^mailto:')):
-                        email = mailto['href'].replace('mailto:', '').split('?')[0]
-                        if self.is_sales_email(email):
-                            contact_info['emails'].append(email)
-                    
+                    contact_page = self.try_fetch_url(page_url)
+                    if contact_page:
+                        pages.append(contact_page.text)
                 except:
                     continue
+        except Exception as e:
+            print(f"  Error scraping {url}: {e}")
+        
+        return self.parse_contact_pages(url, pages)
+    
+    def parse_contact_pages(self, url, pages):
+        """Extract contact information from the HTML of a company's pages
+        
+        Args:
+            url: Company website URL (used to prioritize same-domain emails)
+            pages: List of HTML strings (main page first, then contact pages)
+        """
+        email_domain = self.extract_email_domain(url)
+        contact_info = self._empty_contact_info()
+        
+        try:
+            all_emails = []
+            all_phones = []
+            all_links = []
             
-            # Extract structured contact information (name, title, email, phone together)
-            for soup_obj in all_soups:
-                # Look for common patterns where contact info is grouped
-                # Pattern 1: div/section containing name, title, email, phone
-                for container in soup_obj.find_all(['div', 'section', 'article', 'li']):
-                    container_html = str(container)
-                    container_text = container.get_text(separator=' ', strip=True)
-                    
-                    # Check if this container has both email and name patterns
-                    email_match = re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', container_text)
-                    
-                    if email_match:
-                        email = email_match.group()
-                        if not self.is_sales_email(email):
-                            continue
-                        
-                        # Look for name (usually before email, capitalized words)
-                        name_pattern = r'([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)'
-                        name_match = re.search(name_pattern, container_text)
-                        
-                        # Look for title/role keywords
-                        title_keywords = ['CEO', 'CTO', 'COO', 'Director', 'Manager', 'Head', 
-                                        'Toimitusjohtaja', 'Johtaja', 'Päällikkö', 'Sales', 'Myynti']
-                        title = None
-                        for keyword in title_keywords:
-                            if keyword.lower() in container_text.lower():
-                                title = keyword
-                                break
-                        
-                        # Look for phone in same container
-                        phone_pattern = r'\+?358[\s-]?\d{1,2}[\s-]?\d{3,4}[\s-]?\d{3,4}|0\d{1,2}[\s-]?\d{3,4}[\s-]?\d{3,4}'
-                        phone_match = re.search(phone_pattern, container_text)
-                        
-                        # If we found a name or title, save structured contact
-                        if name_match or title:
-                            contact = {
-                                'name': name_match.group().strip() if name_match else None,
-                                'title': title,
-                                'email': email,
-                                'phone': phone_match.group().strip() if phone_match else None
-                            }
-                            # Avoid duplicates
-                            if contact not in contact_info['contacts']:
-                                contact_info['contacts'].append(contact)
-            
-            # Find emails from text - prioritize emails from company domain
-            emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', all_text)
-            
-            # Also find obfuscated emails like "sales (at) company.fi" or "sales[at]company.fi"
-            obfuscated_pattern = r'\b([A-Za-z0-9._%+-]+)\s*[\(\[]\s*at\s*[\)\]]\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})\b'
-            obfuscated_emails = re.findall(obfuscated_pattern, all_text, re.IGNORECASE)
+            for page_html in pages:
+                try:
+                    # One walk over the text nodes per page; every pattern then
+                    # runs once over the joined text instead of once per container
+                    page = PageText(parse_html(page_html))
+                except Exception:
+                    continue
+                
+                all_links.extend(page.links)
+                all_emails.extend(extract_emails(page.text))
+                all_phones.extend(extract_phones(page.text))
+                
+                # Structured contacts (name, title, email, phone in the same block)
+                for contact in extract_contacts(page):
+                    if self.is_sales_email(contact['email']) and contact not in contact_info['contacts']:
+                        contact_info['contacts'].append(contact)
             
-            # Convert obfuscated emails to proper format
-            for local, domain in obfuscated_emails:
-                proper_email = f"{local}@{domain}"
-                if proper_email not in emails:
-                    emails.append(proper_email)
+            # Also check for mailto links
+            for href in all_links:
+                if href.startswith('mailto:'):
+                    all_emails.append(href.replace('mailto:', '').split('?')[0])
             
-            # Separate emails by domain match
+            # Separate emails by domain match - prioritize emails from company domain
             domain_emails = []
             other_emails = []
             
-            for email in emails:
+            for email in all_emails:
                 if not self.is_sales_email(email):
                     continue
                     
@@ -280,23 +261,19 @@ class YTJCompanyScraper:
             # Prioritize domain-matching emails
             contact_info['emails'] = (domain_emails + other_emails)[:5]
             
-            # Find phone numbers (Finnish format)
-            phones = re.findall(r'\+?358[\s-]?\d{1,2}[\s-]?\d{3,4}[\s-]?\d{3,4}', all_text)
-            phones += re.findall(r'0\d{1,2}[\s-]?\d{3,4}[\s-]?\d{3,4}', all_text)
-            contact_info['phones'] = list(set(phones))[:5]
+            # Phone numbers (Finnish format)
+            contact_info['phones'] = list(set(all_phones))[:5]
             
             # Find social media links
-            for soup_obj in all_soups:
-                for link in soup_obj.find_all('a', href=True):
-                    href = link['href']
-                    if 'linkedin.com' in href and 'linkedin' not in contact_info['social_media']:
-                        contact_info['social_media']['linkedin'] = href
-                    elif 'facebook.com' in href and 'facebook' not in contact_info['social_media']:
-                        contact_info['social_media']['facebook'] = href
-                    elif ('twitter.com' in href or 'x.com' in href) and 'twitter' not in contact_info['social_media']:
-                        contact_info['social_media']['twitter'] = href
-                    elif 'instagram.com' in href and 'instagram' not in contact_info['social_media']:
-                        contact_info['social_media']['instagram'] = href
+            for href in all_links:
+                if 'linkedin.com' in href and 'linkedin' not in contact_info['social_media']:
+                    contact_info['social_media']['linkedin'] = href
+                elif 'facebook.com' in href and 'facebook' not in contact_info['social_media']:
+                    contact_info['social_media']['facebook'] = href
+                elif ('twitter.com' in href or 'x.com' in href) and 'twitter' not in contact_info['social_media']:
+                    contact_info['social_media']['twitter'] = href
+                elif 'instagram.com' in href and 'instagram' not in contact_info['social_media']:
+                    contact_info['social_media']['instagram'] = href
             
         except Exception as e:
             print(f"  Error scraping {url}: {e}")
@@ -404,7 +381,6 @@ class YTJCompanyScraper:
                 if not result['website']:
                     print(f"  Searching for website...")
                     result['website'] = self.duckduckgo_search(result['name'])
-                    time.sleep(2)  # Rate limiting for DuckDuckGo
                 
                 # Scrape contact info from website
                 if result['website']:
@@ -424,8 +400,6 @@ class YTJCompanyScraper:
                         print(f"  ✓ Found {len(result['contact_info']['emails'])} email(s)")
                     if result['contact_info']['phones']:
                         print(f"  ✓ Found {len(result['contact_info']['phones'])} phone(s)")
-                    
-                    time.sleep(2)  # Rate limiting
                 else:
                     print(f"  ✗ No website found")
                 